@@ -0,0 +1,80 @@
+"""
+Import time benchmark for the solver entry points.
+
+Every module is imported in a fresh interpreter, as a sweep worker would, and the wall time of the import is reported
+together with any heavy optional dependency it pulled in. Exits with status 1 if an entry point loads one of the
+forbidden dependencies, so CI can track both the timings and the lazy imports.
+
+    python bench_imports.py [repeats] > bench_output.txt
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+# Modules whose import time is tracked, and the dependencies each of them must not load at import time.
+ENTRY_POINTS = {
+    "pceSolvers.discreteSolver": ["pygambit", "matplotlib", "params_proto", "pulp", "scipy", "networkx", "tqdm"],
+    "game": ["pygambit", "matplotlib", "params_proto", "pulp", "scipy"],
+    "majority": ["pygambit", "matplotlib", "params_proto", "pulp", "scipy"],
+    "traffic": ["pygambit", "matplotlib", "params_proto", "pulp", "scipy"],
+}
+
+# Dependencies whose presence after an import is reported.
+HEAVY = ["pygambit", "matplotlib", "params_proto", "pulp", "scipy", "networkx", "tqdm"]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def timeImport(module, repeats):
+    """
+    Import module in repeats fresh interpreters. Returns the import times in seconds and the heavy dependencies that
+    were loaded.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get("PYTHONPATH")])))
+    times, loaded = [], []
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+            cwd=here,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if out.returncode != 0:
+            raise RuntimeError("Importing {} failed:\n{}".format(module, out.stderr))
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        times.append(result["seconds"])
+        loaded = result["loaded"]
+    return times, loaded
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    failed = False
+    for module, forbidden in ENTRY_POINTS.items():
+        times, loaded = timeImport(module, repeats)
+        violations = [dep for dep in loaded if dep in forbidden]
+        failed |= bool(violations)
+        print(
+            "{:28s} median {:7.1f} ms  min {:7.1f} ms  loaded: {}{}".format(
+                module,
+                1000 * statistics.median(times),
+                1000 * min(times),
+                ", ".join(loaded) or "-",
+                "  FORBIDDEN: " + ", ".join(violations) if violations else "",
+            )
+        )
+
+    sys.exit(1 if failed else 0)
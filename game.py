@@ -1,11 +1,17 @@
-import pygambit
 import itertools
 import numpy as np
 
-from pceSolvers.discreteSolver import DiscreteSolver
+from pceSolvers.discreteSolver import DiscreteSolver, utilityTable
+from pceSolvers.resultCache import defaultCache, gameKey, isPlayerSymmetric
+from pceSolvers.resultStore import resultKey
+from pceSolvers.warmStart import SubgraphSeeds, nestedOrder
 
 
 class SimpleGame:
+    # Set to True in games where a player's payoff only depends on its own action and on how many opponents take each
+    # action. The solver then merges opponent profiles with the same counts in its best response LPs.
+    anonymous = False
+
     def __init__(self, numPlayers, numActions, utilities):
         """
         Create a new simple game with numPlayers players and numActions actions.
@@ -16,26 +22,295 @@ class SimpleGame:
         self.numPlayers = numPlayers
         self.numActions = numActions
         self.utilities = utilities
+        self._payoffs = None
+        self._game = None
+        self._countClasses = None
+        self._classTables = None
+
+        # Cache of solved PCE sets, shared across isomorphic networks when the game is symmetric in the players. Set to
+        # None to always solve.
+        self.pceCache = defaultCache
+        self._cacheKey = None
+
+        # Optional PCEStore that persists solved PCE sets across runs, so interrupted sweeps can resume.
+        self.resultStore = None
+
+    @property
+    def payoffs(self):
+        """
+        Dense payoff tensor of shape (numPlayers, numActions, ..., numActions), where payoffs[i][profile] is the utility
+        of player i under profile. Built once on first access and shared by every solver configured on this game.
+        """
+        if self._payoffs is None:
+            self._payoffs = self.createPayoffs()
+        return self._payoffs
+
+    @property
+    def game(self):
+        """
+        pygambit table of the game. Games that only define createPayoffs get it built from the payoff tensor the first
+        time it is needed (e.g. by solveNash).
+        """
+        if self._game is None:
+            self._game = self.createGame()
+        return self._game
+
+    @game.setter
+    def game(self, game):
+        self._game = game
+
+    def createGame(self):
+        """
+        Build the pygambit table from self.payoffs.
+        """
+        import pygambit
+
+        game = pygambit.Game.new_table([self.numActions] * self.numPlayers)
+        game.title = type(self).__name__
+        flat = self.payoffs.reshape(self.numPlayers, -1)
+        for code, profile in enumerate(
+            itertools.product(range(self.numActions), repeat=self.numPlayers)
+        ):
+            for player in range(self.numPlayers):
+                value = flat[player, code].item()
+                game[profile][player] = int(value) if value.is_integer() else value
+        return game
+
+    def createPayoffs(self):
+        """
+        Read the payoff tensor out of the pygambit table in self.game, one cell at a time. Subclasses should override
+        this with a vectorized construction.
+        """
+        payoffs = np.zeros((self.numPlayers,) + (self.numActions,) * self.numPlayers)
+        for profile in itertools.product(
+            range(self.numActions), repeat=self.numPlayers
+        ):
+            for player in range(self.numPlayers):
+                payoffs[(player,) + profile] = float(self.game[profile][player])
+        return payoffs
+
+    def actionCounts(self):
+        """
+        For every profile, in itertools.product order, the action of each player and the number of players taking each
+        action.
+
+        Returns arrays of shape (numActions**numPlayers, numPlayers) and (numActions**numPlayers, numActions).
+        """
+        codes = np.arange(self.numActions**self.numPlayers)
+        radix = self.numActions ** np.arange(self.numPlayers - 1, -1, -1)
+        actions = (codes[:, None] // radix) % self.numActions
+        counts = np.zeros((len(codes), self.numActions), dtype=np.int64)
+        for player in range(self.numPlayers):
+            counts[codes, actions[:, player]] += 1
+        return actions, counts
+
+    def opponentClasses(self, player):
+        """
+        For games whose payoffs only depend on a player's own action and some aggregate of the opponents' actions,
+        returns an array mapping every opponent sub-profile code of player (player's digit removed, radix numActions
+        over the other players) to an id of its aggregate, or None if payoffs are not known to aggregate.
+
+        Anonymous games use the count vector of the opponents' actions, which is the same map for every player and is
+        computed once. Aggregative games can override this with their own aggregate.
+        """
+        if not self.anonymous:
+            return None
+        if self._countClasses is not None:
+            return self._countClasses
+        numOpponents = self.numPlayers - 1
+        codes = np.arange(self.numActions**numOpponents)
+        radix = self.numActions ** np.arange(numOpponents - 1, -1, -1)
+        actions = (codes[:, None] // radix) % self.numActions
+        counts = np.zeros((len(codes), self.numActions), dtype=np.int64)
+        for opponent in range(numOpponents):
+            counts[codes, actions[:, opponent]] += 1
+        _, classes = np.unique(counts, axis=0, return_inverse=True)
+        self._countClasses = classes.reshape(-1)
+        return self._countClasses
+
+    def opponentClassTables(self):
+        """
+        The opponent classes of every player, relabeled 0..numClasses-1, and the (numActions, numClasses) tables of
+        each player's utility for every action against every class, or None if opponentClasses gives no classes.
+        Checks that payoffs really are constant on the classes. Computed once per game and shared by every solver
+        configured on it.
+        """
+        if self._classTables is None:
+            self._classTables = self.buildClassTables() or ()
+        return self._classTables or None
+
+    def buildClassTables(self):
+        allClasses, allUtilities = [], []
+        for player in range(self.numPlayers):
+            classes = self.opponentClasses(player)
+            if classes is None:
+                return None
+            _, classes = np.unique(classes, return_inverse=True)
+            classes = classes.reshape(-1)
+            _, first = np.unique(classes, return_index=True)
+            utilities = utilityTable(self.payoffs, player)
+            table = utilities[:, first]
+            assert np.allclose(
+                table[:, classes], utilities
+            ), "Payoffs of player {} do not only depend on its opponent classes!".format(
+                player
+            )
+            allClasses.append(classes)
+            allUtilities.append(table)
+        return allClasses, allUtilities
 
     def configureSolver(
-        self, network, solverType="PULP_CBC_CMD", writePath="results/test.pkl"
+        self,
+        network,
+        solverType="PULP_CBC_CMD",
+        writePath="results/test.pkl",
+        **solverOptions
     ):
         """
         Configure the solver to be used for solving the game.
+        solverOptions: extra keyword arguments forwarded to DiscreteSolver (e.g. rationalize=True).
         """
         self.solver = DiscreteSolver(
-            self, solverType, network, verbose=self.verbose, writePath=writePath
+            self,
+            solverType,
+            network,
+            verbose=self.verbose,
+            writePath=writePath,
+            **solverOptions
         )
         print("Configured Solver!")
 
     def solvePCE(self):
         """
-        Solve the game using the solver.
+        Solve the game using the solver. If this game was already solved on an isomorphic network (an identical one, for
+        games that are not symmetric in the players), the cached PCE set is relabeled and returned instead. Otherwise,
+        with a resultStore, the PCE set is read from the store, or solved and written to it. Results that are not
+        solved are still written to the solver's writePath.
         """
-        out = self.solver.solve()
+        if self.pceCache is None and self.resultStore is None:
+            return self.solver.solve()
+
+        out = self.lookupResult()
+        if out is None:
+            out = self.solver.solve()
+            self.recordResult(out)
+        else:
+            # The solver did not run, so write its result file for it.
+            self.solver.writeResult(out)
         # print("Solved Game!")
         return out
 
+    def cacheKey(self):
+        """
+        Identity of the game's payoffs and whether they are symmetric in the players, computed once.
+        """
+        if self._cacheKey is None:
+            self._cacheKey = (gameKey(self.payoffs), isPlayerSymmetric(self.payoffs))
+        return self._cacheKey
+
+    def lookupResult(self, name=None, countMiss=True):
+        """
+        Look up a result for the configured network in pceCache (up to isomorphism, for games symmetric in the players)
+        and then in resultStore. The result is the PCE set, or the answer recorded under name by containsPCE. Returns
+        None if neither holds one. countMiss is passed on to PCECache.lookup.
+        """
+        key, symmetric = self.cacheKey()
+        network = self.solver.network
+        if name is not None:
+            key = (key, name)
+
+        if self.pceCache is not None:
+            out = self.pceCache.lookup(key, network, symmetric, countMiss)
+            if out is not None:
+                return out
+
+        if self.resultStore is not None:
+            out = self.resultStore.get(self.storeKey(name), countMiss)
+            if out is not None:
+                if self.pceCache is not None:
+                    self.pceCache.store(key, network, symmetric, out)
+                return out
+        return None
+
+    def recordResult(self, profiles, name=None):
+        """
+        Record profiles (the PCE set, or the answer of containsPCE under name) for the configured network in pceCache
+        and resultStore.
+        """
+        key, symmetric = self.cacheKey()
+        network = self.solver.network
+        if self.resultStore is not None:
+            self.resultStore.put(
+                self.storeKey(name), self.numPlayers, self.numActions, network, profiles
+            )
+        if self.pceCache is not None:
+            self.pceCache.store(
+                key if name is None else (key, name), network, symmetric, profiles
+            )
+
+    def storeKey(self, name=None):
+        options = self.solver.resultOptions()
+        if name is not None:
+            options = dict(options, contains=name)
+        return resultKey(self.cacheKey()[0], self.solver.network, options)
+
+    def solveNested(
+        self, graphs, solverType="PULP_CBC_CMD", seeds=None, **solverOptions
+    ):
+        """
+        Solve the game on every graph in graphs, in order of edge inclusion, starting each solve from the PCE of an
+        already solved subgraph (see pceSolvers.warmStart). Subgraphs are matched up to isomorphism when the game is
+        symmetric in the players. Pass seeds (a SubgraphSeeds) to carry solved graphs over between calls.
+
+        Yields (graph, pce) pairs.
+        """
+        if seeds is None:
+            seeds = SubgraphSeeds(embed=isPlayerSymmetric(self.payoffs))
+        for graph in nestedOrder(graphs):
+            self.configureSolver(
+                graph,
+                solverType,
+                writePath=None,
+                initialProfiles=seeds.seed(graph),
+                **solverOptions
+            )
+            pce = self.solvePCE()
+            seeds.add(graph, pce)
+            yield graph, pce
+
+    def containsPCE(self, predicate, name=None):
+        """
+        Check whether the PCE on the configured network contains a profile satisfying predicate, by growing a
+        self-supporting set around candidate profiles instead of solving for the whole PCE (see
+        DiscreteSolver.contains). Returns (found, witness).
+
+        A PCE set of the network (or of an isomorphic one) in pceCache or resultStore answers the query directly. With
+        name, a hashable label of predicate, answers are also recorded in both under that name: the self-supporting
+        witness set, or no profiles if there is none. For games symmetric in the players, answers are shared between
+        isomorphic networks, so the predicate must not change under relabeling the players (e.g. depend only on how
+        many players take each action).
+        """
+        if self.pceCache is None and self.resultStore is None:
+            return self.solver.contains(predicate)
+
+        pce = self.lookupResult(countMiss=name is None)
+        if pce is not None:
+            return (True, pce) if any(predicate(x) for x in pce) else (False, None)
+
+        if name is not None:
+            witness = self.lookupResult(name)
+            if witness is not None and not witness:
+                return False, None
+            if witness is not None and any(predicate(x) for x in witness):
+                return True, witness
+
+        found, witness = self.solver.contains(predicate)
+        if name is not None:
+            self.recordResult(witness if found else [], name)
+        return found, witness
+
     def solveNash(self):
+        import pygambit
+
         solver = pygambit.nash.ExternalEnumPureSolver()
         return solver.solve(self.game)
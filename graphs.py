@@ -0,0 +1,123 @@
+"""
+Lazy sources of networks for the graph sweeps.
+
+Every source is a generator, so the first graph can be solved as soon as it is produced and a full enumeration is
+never held in memory. Sources take res/mod arguments that keep only every mod-th graph starting at res, so an
+enumeration can be split across workers.
+"""
+
+import itertools
+import subprocess
+
+import numpy as np
+import networkx as nx
+
+
+def decodeGraph6(line):
+    """
+    Decode a single graph6 string (as written by geng) into an nx.Graph on nodes 0..n-1.
+    """
+    data = line.strip()
+    if data.startswith(">>graph6<<"):
+        data = data[len(">>graph6<<") :]
+    values = [ord(c) - 63 for c in data]
+
+    # The number of nodes takes one, four or eight bytes.
+    if values[0] < 63:
+        n, values = values[0], values[1:]
+    elif values[1] < 63:
+        n, values = _bigEndian(values[1:4]), values[4:]
+    else:
+        n, values = _bigEndian(values[2:8]), values[8:]
+
+    G = nx.Graph()
+    G.add_nodes_from(range(n))
+
+    # The upper triangle of the adjacency matrix, column by column, six bits per byte.
+    bits = ((value >> shift) & 1 for value in values for shift in range(5, -1, -1))
+    pairs = ((i, j) for j in range(1, n) for i in range(j))
+    G.add_edges_from(pair for pair, bit in zip(pairs, bits) if bit)
+    return G
+
+
+def _bigEndian(values):
+    total = 0
+    for value in values:
+        total = (total << 6) | value
+    return total
+
+
+def shard(graphs, res=0, mod=1):
+    """
+    Keep every mod-th graph of graphs, starting at position res.
+    """
+    return itertools.islice(graphs, res, None, mod)
+
+
+def gengGraphs(n, minDegree=0, maxDegree=None, connected=True, res=0, mod=1):
+    """
+    Stream the graphs enumerated by nauty's geng, decoding its graph6 output in-process. Sharding is done by geng
+    itself through its res/mod argument.
+    """
+    command = ["geng", "-q"]
+    if connected:
+        command.append("-c")
+    command.append("-d{}".format(minDegree))
+    if maxDegree is not None:
+        command.append("-D{}".format(maxDegree))
+    command.append(str(n))
+    if mod > 1:
+        command.append("{}/{}".format(res, mod))
+
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        for line in process.stdout:
+            if line.strip():
+                yield decodeGraph6(line)
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+def regularGraphs(n, gamma, connected=True, res=0, mod=1):
+    """
+    Stream all (connected) gamma-regular graphs on n nodes.
+    """
+    return gengGraphs(n, gamma, gamma, connected=connected, res=res, mod=mod)
+
+
+# Graphs of networkx's atlas grouped by number of nodes, built on first use.
+_atlasBySize = None
+
+
+def atlasGraphs(n, res=0, mod=1):
+    """
+    Iterate over the graphs with n nodes in networkx's graph atlas (all graphs with up to 7 nodes).
+    """
+    global _atlasBySize
+    if _atlasBySize is None:
+        from networkx.generators.atlas import graph_atlas_g
+
+        _atlasBySize = {}
+        for graph in graph_atlas_g():
+            _atlasBySize.setdefault(len(graph), []).append(graph)
+    return shard(iter(_atlasBySize.get(n, [])), res, mod)
+
+
+def randomGraphs(n, p, seed=0, count=None, res=0, mod=1):
+    """
+    Stream G(n, p) random graphs. The i-th graph is generated from its own seed derived from (seed, i), so the
+    stream is reproducible, shards independently, and the same trial index gives common random numbers across
+    different values of p.
+    """
+    indices = itertools.count() if count is None else range(count)
+    for i in shard(indices, res, mod):
+        yield nx.gnp_random_graph(n, p, seed=trialSeed(seed, i))
+
+
+def trialSeed(seed, trial):
+    """
+    Seed of trial number trial in a stream seeded with seed.
+    """
+    return int(np.random.SeedSequence([seed, trial]).generate_state(1)[0])
@@ -1,17 +1,13 @@
 import pickle
 
 import networkx as nx
-import pygambit
-import itertools
 import numpy as np
-import subprocess
 
-from matplotlib import pyplot as plt
-from networkx.generators.atlas import graph_atlas_g
 from tqdm import tqdm
 
 from game import SimpleGame
-from traffic import parse_edge_list
+from graphs import atlasGraphs, randomGraphs, regularGraphs, shard
+from sampling import AdaptiveEstimate
 
 
 class SimpleMajorityGame(SimpleGame):
@@ -21,6 +17,8 @@ class SimpleMajorityGame(SimpleGame):
     This is the opposite of the traffic game, where players solely care about being in the minority group.
     """
 
+    anonymous = True
+
     def __init__(self, numPlayers, numActions, verbose=False):
         """
         :param numPlayers: Number of players playing the [numActions] majority game.
@@ -34,7 +32,6 @@ class SimpleMajorityGame(SimpleGame):
                 for i in range(numPlayers)
             ],
         )
-        self.game = self.createGame()
         self.verbose = verbose
 
     @staticmethod
@@ -42,83 +39,61 @@ class SimpleMajorityGame(SimpleGame):
         majority = np.argmax(np.bincount(profile))
         return 1 if profile[player] == majority else 0
 
-    def createGame(self):
-        game = pygambit.Game.new_table([self.numActions] * self.numPlayers)
-
-        game.title = "SimpleMajorityGame"
-
-        # Iterate through all strategy profiles to set rewards (without using game.contingencies)
-        for profile in itertools.product(
-            range(self.numActions), repeat=self.numPlayers
-        ):
-            # Assign utility to each player
-            for player in range(self.numPlayers):
-                # game[profile][player] = int(
-                #     self.utilities[player](profile)
-                # )
-                game[profile][player] = int(
-                    SimpleMajorityGame.binaryPreference(player, profile)
-                )
-
-        return game
+    def createPayoffs(self):
+        """
+        Build the payoff tensor for all profiles at once: a player gets 1 when its action is the most popular one (ties
+        go to the lowest action, as in binaryPreference).
+        """
+        actions, counts = self.actionCounts()
+        majority = np.argmax(counts, axis=1)
+        payoffs = (actions == majority[:, None]).astype(float).T
+        return payoffs.reshape((self.numPlayers,) + (self.numActions,) * self.numPlayers)
 
 
-def analyze(n, gamma, game, early_stop=True):
+def analyze(n, gamma, game, early_stop=True, res=0, mod=1):
     """
     Examine all gamma-regular graphs with n nodes and determine if there exists a PCE with
-    an even split among players.
+    an even split among players. Only every mod-th graph starting at res is examined, to split the enumeration across
+    workers. Set game.resultStore to a PCEStore to make the sweep resumable.
 
     TODO: Save all graphs that permit an even split.
     """
     assert gamma < n, "gamma must be less than n"
 
-    geng_cmd = f"geng -c -d{gamma} -D{gamma} {n}"
-    showg_cmd = "showg -e"
-
-    # Run the geng and showg commands and get the output
-    geng_output = subprocess.run(
-        geng_cmd, stdout=subprocess.PIPE, shell=True, text=True
-    )
-    edge_list_output = subprocess.run(
-        showg_cmd,
-        input=geng_output.stdout,
-        stdout=subprocess.PIPE,
-        shell=True,
-        text=True,
-    )
-
-    # Split the output into individual edge lists
-    edge_lists = edge_list_output.stdout.strip().split("\n\n")
-
-    if gamma != 0 and edge_lists == [""]:
-        print("No graphs found!")
-        return None, None
-
-    all_graphs = []
-    for edge_list in edge_lists:
-        G = nx.Graph()
-        G.add_nodes_from(range(n))
-        G.add_edges_from(parse_edge_list(edge_list))
-        all_graphs.append(G)
+    # geng finds no connected 0-regular graphs, so gamma=0 is the empty network.
+    if gamma != 0:
+        graphs = regularGraphs(n, gamma, res=res, mod=mod)
+    else:
+        graphs = shard(iter([nx.empty_graph(n)]), res, mod)
 
     history = []
+    numGraphs = 0
     for graph in tqdm(
-        all_graphs,
+        graphs,
         desc=f"Solving gamma-complete graphs for n={n}, gamma={gamma}",
     ):
+        numGraphs += 1
         game.configureSolver(
             graph, "PULP_CBC_CMD", writePath=None
         )  # "results/traffic.pkl")
 
-        pce = game.solvePCE()
-        count_ones = [sum(x) == n // 2 for x in pce]
-        found = np.argmax(count_ones)
-        # smallest = min(pce, key=lambda x: sum(x))
-        if any(count_ones):
+        # Only ask for a PCE profile with an even split instead of solving for the whole PCE.
+        found, witness = game.containsPCE(
+            lambda x: sum(x) == n // 2, name="sum(x) == n // 2"
+        )
+        if found:
             print("Found a graph with an even split!")
+            profile = next(x for x in witness if sum(x) == n // 2)
             if early_stop:
-                return pce[found], graph
-            history.append((pce[found], graph))
+                return profile, graph
+            history.append((profile, graph))
+    if numGraphs == 0:
+        print("No graphs found!")
+        return None, None
+    if game.pceCache is not None:
+        print(game.pceCache.report())
+    if game.resultStore is not None:
+        print(game.resultStore.report())
     if not early_stop:
         return history
     return None, None
@@ -131,63 +106,75 @@ def searchGraphs(n, majorityGame):
     """
 
     # Iterate through all possible graphs
-    graphs = []
-    for i, graph in enumerate(graph_atlas_g()):
-        if len(graph) == n:
-            graphs.append(graph)
+    graphs = list(atlasGraphs(n))
 
     goodGraphs = []
     badGraphs = []
     for graph in tqdm(graphs, desc="Searching graphs", colour="green"):
         # Check if the graph gives rise to a PCE set containing a profile where n/2 players take each action
         majorityGame.configureSolver(
-            graph, "PULP_CBC_CMD", writePath="results/Majority.pkl"
+            graph, "PULP_CBC_CMD", writePath=None
         )
-        pce = majorityGame.solvePCE()
-
-        for profile in pce:
-            count_ones = sum(profile)
-            if count_ones == n // 2 or len(profile) - count_ones == n // 2:
-                goodGraphs.append(graph)
-                print("Found graph with n/2 players taking each action")
-                break
+        found, _ = majorityGame.containsPCE(
+            lambda profile: n // 2 in (sum(profile), len(profile) - sum(profile)),
+            name="n // 2 in (sum(x), n - sum(x))",
+        )
+        if found:
+            goodGraphs.append(graph)
+            print("Found graph with n/2 players taking each action")
         else:
             badGraphs.append(graph)
+    if majorityGame.pceCache is not None:
+        print(majorityGame.pceCache.report())
     return goodGraphs, badGraphs
 
 
-def simulateRandomGraphs(num_trials, n, p):
+def simulateRandomGraphs(
+    maxTrials, n, p, targetWidth=None, confidence=0.95, minTrials=20, seed=0
+):
     """
-    Simulate random graphs with n nodes and edge probability p and compute PCE sets on them.
-    We compute the probability that a PCE set contains a profile where n/2 players take each action.
+    Simulate random graphs with n nodes and edge probability p and estimate the probability that their PCE set
+    contains a profile where n/2 players take each action.
+
+    Trials stop once the Wilson interval at the given confidence is at most targetWidth wide, or after maxTrials
+    trials (always, if targetWidth is None). Graphs come from the seeded stream graphs.randomGraphs, so calls with the
+    same seed and different p use common random numbers.
+
+    Returns the estimate, its confidence interval, and the graphs with and without an even split.
     """
     majorityGame = SimpleMajorityGame(n, 2)
+    estimate = AdaptiveEstimate(targetWidth, confidence, minTrials, maxTrials)
     goodGraphs = []
     badGraphs = []
-    for i in tqdm(range(num_trials), desc="Simulating random graphs", colour="green"):
-        graph = nx.gnp_random_graph(n, p)
-        majorityGame.configureSolver(
-            graph, "PULP_CBC_CMD", writePath="results/Majority.pkl"
-        )
-        pce = majorityGame.solvePCE()
-
-        for profile in pce:
-            count_ones = sum(profile)
-            if count_ones == n // 2 or len(profile) - count_ones == n // 2:
+    with tqdm(desc="Simulating random graphs", colour="green") as progress:
+        for graph in randomGraphs(n, p, seed=seed, count=maxTrials):
+            majorityGame.configureSolver(
+                graph, "PULP_CBC_CMD", writePath=None
+            )
+            found, _ = majorityGame.containsPCE(
+                lambda profile: n // 2 in (sum(profile), len(profile) - sum(profile)),
+                name="n // 2 in (sum(x), n - sum(x))",
+            )
+            estimate.record(found)
+            if found:
                 goodGraphs.append(graph)
-                print("Found graph with n/2 players taking each action")
+            else:
+                badGraphs.append(graph)
+            progress.update()
+            progress.set_postfix_str(estimate.report())
+            if estimate.done():
                 break
-        else:
-            badGraphs.append(graph)
 
-    p = len(goodGraphs) / num_trials
+    print("p={}: {}".format(p, estimate.report()))
+    if majorityGame.pceCache is not None:
+        print(majorityGame.pceCache.report())
 
-    return p, goodGraphs, badGraphs
+    return estimate.estimate(), estimate.interval(), goodGraphs, badGraphs
 
 
 if __name__ == "__main__":
 
-    print(simulateRandomGraphs(100, 5, 0.25))
+    print(simulateRandomGraphs(100, 5, 0.25, targetWidth=0.1))
 
     # n = 9
     # majorityGame = SimpleMajorityGame(n, 2, verbose=True)
@@ -1,29 +1,76 @@
 """
 Suggestion:
-As the inital solve is often the bottleneck, maybe we can improve the performance by first restricting to the set
-of rationalizable strategies.
+The initial solve is often the bottleneck. rationalize=True already restricts it to the rationalizable strategies
+(see DiscreteSolver.rationalizableActions) before the fixpoint starts.
 
-Can also increase threads further and investigate presolve option.
+The best response LPs are small, so the in-process "HIGHS" and "SIMPLEX" backends and worker processes (workers)
+pay off more than solver threads, which default to numThreads=1. The presolve option is still to be investigated.
 
 Also can try to use a different solver (e.g. PYGLPK) and see if that helps.
 """
 
 
+import hashlib
 import itertools
 import os
 import pickle
 import sys
 import io
+import time
 
-from tqdm import tqdm
-from params_proto import Proto, ParamsProto, PrefixProto
-import pulp as pl
 import numpy as np
-import networkx as nx
 
 
 import contextlib
 import functools
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from pceSolvers.lpBackends import getBackend
+from pceSolvers.resultCache import gameKey
+from pceSolvers.resultStore import graphKey
+from pceSolvers.symmetry import (
+    closedSubset,
+    detectSymmetries,
+    isSymmetry,
+    profileOrbits,
+)
+
+
+def utilityTable(payoffs, player):
+    """
+    The (numActions, numActions**(numPlayers - 1)) table whose [a, o] entry is the utility of player for action a
+    against the opponent sub-profile with code o (player's digit removed from the profile code).
+    """
+    numPlayers, numActions = payoffs.shape[0], payoffs.shape[1]
+    return (
+        payoffs[player]
+        .reshape(
+            numActions**player,
+            numActions,
+            numActions ** (numPlayers - 1 - player),
+        )
+        .transpose(1, 0, 2)
+        .reshape(numActions, -1)
+    )
+
+
+# Neighbor-projection index of one player, see DiscreteSolver.buildIndex.
+NeighborIndex = namedtuple(
+    "NeighborIndex",
+    [
+        "pairIds",  # (projection, opponent sub-profile) pair of each profile
+        "counts",  # number of surviving profiles with each pair
+        "slotPairs",  # pairs of each bucket in order, dead ones dropped when the bucket is compacted
+        "slotOpponents",  # opponent code of the pair in each slot
+        "buckets",  # bucket (projection) of each profile
+        "bucketBounds",  # slots of bucket b start at bucketBounds[b]
+        "bucketStop",  # slots of bucket b end at bucketStop[b]
+        "bucketDead",  # number of dead pairs among the slots of each bucket
+        "members",  # profiles sorted by bucket
+        "memberStart",  # profiles of bucket b are members[memberStart[b]:memberStart[b + 1]]
+    ],
+)
 
 
 class DiscreteSolver:
@@ -31,151 +78,1103 @@ class DiscreteSolver:
         self,
         gameWrapper,
         solver,
-        network: nx.Graph = None,
+        network=None,
         verbose=False,
         optVerbose=False,
-        numThreads=8,
+        numThreads=1,
         presolve=False,
         writePath=None,
+        screen=True,
+        rationalize=False,
+        memoSize=100000,
+        incremental=True,
+        reuseCertificates=True,
+        tolerance=1e-9,
+        workers=1,
+        chunkSize=None,
+        symmetry=False,
+        initialProfiles=None,
+        checkpointPath=None,
+        checkpointInterval=300.0,
+        modelCacheSize=10000,
+        dominatorCacheSize=64,
+        columnGeneration=2048,
+        columnBatch=32,
     ):
         self.gameWrapper = gameWrapper
-        self.game = gameWrapper.game
-        self.solver = pl.getSolver(solver, msg=optVerbose, threads=numThreads)
-        self.model = pl.LpProblem("Game", pl.LpMaximize)
-        self.profiles = list(
-            itertools.product(
-                range(self.gameWrapper.numActions), repeat=self.gameWrapper.numPlayers
-            )
+        self.numPlayers = gameWrapper.numPlayers
+        self.numActions = gameWrapper.numActions
+        self.payoffs = gameWrapper.payoffs
+        self.backend = getBackend(solver, msg=optVerbose, threads=numThreads)
+        self.solverName = solver if isinstance(solver, str) else type(solver).__name__
+
+        # Profiles are stored as mixed-radix integer codes, code = sum_i profile[i] * radix[i], so that the surviving
+        # set is a NumPy array instead of a list of tuples. Tuples are only decoded when results are returned.
+        self.radix = self.numActions ** np.arange(
+            self.numPlayers - 1, -1, -1, dtype=np.int64
         )
+
+        # utilityTables[i][a, o] is the utility of player i for action a against the opponent sub-profile with code o,
+        # so the rows of every best response LP are slices of these tables.
+        self.utilityTables = [
+            utilityTable(self.payoffs, player) for player in range(self.numPlayers)
+        ]
+        self.profiles = np.arange(self.numActions**self.numPlayers, dtype=np.int64)
+
+        # Start the fixpoint from a known superset of the PCE instead of every profile, e.g. the PCE on a subgraph of
+        # network: adding edges only shrinks consistent sets, so the PCE on a supergraph lies inside it.
+        if initialProfiles is not None:
+            self.profiles = np.unique(self.encode(initialProfiles))
         self.network = network
+        assert self.network is not None, "Network cannot be None!"
+
+        self.neighbors = [
+            sorted(self.network.neighbors(player))
+            for player in range(self.numPlayers)
+        ]
+        self.index = None
+        self.indexCodes = None
 
         self.verbose = verbose
+
+        # Games that declare their payoffs to depend only on an aggregate of the opponents' actions (see
+        # SimpleGame.opponentClassTables) get best response LPs with one column per aggregate instead of per opponent
+        # profile.
+        self.opponentClasses = None
+        self.classUtilities = None
+        classTables = getattr(gameWrapper, "opponentClassTables", None)
+        classTables = classTables() if classTables is not None else None
+        if classTables is not None:
+            self.opponentClasses, self.classUtilities = classTables
+            if self.verbose:
+                print(
+                    "Merging opponent profiles into {} classes per player".format(
+                        self.classUtilities[0].shape[1]
+                    )
+                )
         # TODO: Fix the problem with presolve version of pulp
         self.presolve = presolve
 
         self.writePath = writePath
 
-        assert self.network is not None, "Network cannot be None!"
+        # Settle best response checks with pure witness / strict dominance certificates before building any LP.
+        self.screen = screen
+        self.stats = {
+            "checks": 0,
+            "screened": 0,
+            "lpSolves": 0,
+            "memoHits": 0,
+            "memoMisses": 0,
+            "dominatorHits": 0,
+            "witnessHits": 0,
+            "warmSolves": 0,
+            "pricingRounds": 0,
+        }
+        self.tolerance = tolerance
+
+        # LRU memo of best response checks keyed by (player, own action, digest of the consistent set). memoSize=0
+        # disables it.
+        self.memoSize = memoSize
+        self.memo = OrderedDict()
+
+        # Dominating mixtures pulled from infeasible LPs, stacked per (player, action) into arrays of at most
+        # dominatorCacheSize distinct rows. Consistent sets only shrink while solving, so a stored dominator keeps
+        # rejecting its action for the rest of the solve.
+        self.reuseCertificates = reuseCertificates
+        self.dominatorCacheSize = dominatorCacheSize
+        self.dominators = {}
+
+        # Supports of feasible witness conjectures, kept per (player, action, neighbor projection) and dropped as soon
+        # as one of their opponent profiles leaves the consistent set.
+        self.witnesses = {}
+
+        # LRU of live LP models per (player, action, neighbor projection), for backends that can re-solve a model warm
+        # after columns drop out of its consistent set (see SimplexBackend.model). modelCacheSize=0 disables it.
+        self.modelCacheSize = modelCacheSize
+        self.models = OrderedDict()
+
+        # Solve best response LPs with more than columnGeneration columns (e.g. for the leaves of a star, whose
+        # consistent sets hold nearly every opponent profile) by column generation, adding columnBatch columns per
+        # pricing round. None always solves the full LP.
+        self.columnGeneration = columnGeneration
+        self.columnBatch = columnBatch
+
+        # Use the worklist engine in reduceIncremental instead of repeated reduceProfiles sweeps.
+        self.incremental = incremental
+
+        # Check the profiles of each sweep on a pool of worker processes. Parallel solves use full sweeps, since the
+        # worklist engine eliminates profiles one at a time, and are not available with symmetry, whose orbits are
+        # only handled by the worklist engine. The memo, witness and dominator entries a worker learns are sent back
+        # with each chunk (see learned) and merged into this solver's caches.
+        self.workers = workers
+        self.chunkSize = chunkSize
+        self.learned = None
+
+        # Work on orbit representatives of a symmetry group of the game: True detects network automorphisms and action
+        # relabelings that leave payoffs invariant, or pass a list of (playerPerm, actionPerm) generators.
+        self.symmetry = symmetry
+
+        # Shrink each player's action set to its rationalizable actions before the PCE fixpoint starts.
+        self.rationalize = rationalize
+
+        # Save the state of the fixpoint (surviving profiles, progress and LP caches) to checkpointPath at most every
+        # checkpointInterval seconds, between and inside sweeps. solve() resumes from an existing checkpoint.
+        self.checkpointPath = checkpointPath
+        self.checkpointInterval = checkpointInterval
+        self.lastCheckpoint = time.monotonic()
+
+    def encode(self, profiles):
+        """
+        Mixed-radix codes of a list of profiles (tuples of actions).
+        """
+        profiles = np.asarray(profiles, dtype=np.int64).reshape(-1, self.numPlayers)
+        return profiles @ self.radix
+
+    def decode(self, codes):
+        """
+        Profiles (tuples of actions) of an array of mixed-radix codes.
+        """
+        return list(map(tuple, self.digits(codes).tolist()))
+
+    def digits(self, codes):
+        """
+        Returns the (len(codes), numPlayers) array of actions encoded by codes.
+        """
+        return (np.asarray(codes, dtype=np.int64)[:, None] // self.radix) % self.numActions
+
+    def action(self, code, player):
+        """
+        Action of player in the profile encoded by code.
+        """
+        return int(code // self.radix[player] % self.numActions)
+
+    def opponentCodes(self, codes, player):
+        """
+        Codes of the opponent sub-profiles of codes, i.e. codes with player's digit removed (radix numActions over the
+        other numPlayers - 1 players).
+        """
+        high, low = np.divmod(codes, self.radix[player] * self.numActions)
+        return high * self.radix[player] + low % self.radix[player]
+
+    def neighborKey(self, profile, player):
+        """
+        Projection of the profile encoded by profile onto the actions of player's neighbors in self.network, as an
+        integer code.
+        """
+        key = 0
+        for i in self.neighbors[player]:
+            key = key * self.numActions + self.action(profile, i)
+        return key
+
+    def buildIndex(self, profilesToConsider):
+        """
+        Build, for each player, an index from neighbor projections to the bucket of opponent sub-profiles that appear
+        among the codes profilesToConsider with that projection. Profiles are referred to by their position in
+        profilesToConsider from here on.
+
+        Each (projection, opponent sub-profile) pair gets an id, and pairs are sorted by projection so that every
+        bucket is a contiguous range of slots. A count per pair records how many surviving profiles map to it, so that
+        the index can be kept up to date as profiles are removed, and a bucket drops its dead pairs once they make up
+        half of its slots.
+        """
+        self.indexCodes = profilesToConsider
+        self.index = []
+        digits = self.digits(profilesToConsider)
+        oppositeRadix = self.numActions ** (self.numPlayers - 1)
+        for player in range(self.numPlayers):
+            keys = np.zeros(len(profilesToConsider), dtype=np.int64)
+            for i in self.neighbors[player]:
+                keys = keys * self.numActions + digits[:, i]
+            pairs, pairIds = np.unique(
+                keys * oppositeRadix
+                + self.opponentCodes(profilesToConsider, player),
+                return_inverse=True,
+            )
+            pairKeys, pairOpponents = np.divmod(pairs, oppositeRadix)
+            _, bucketStart, bucketOfPair = np.unique(
+                pairKeys, return_index=True, return_inverse=True
+            )
+            buckets = bucketOfPair[pairIds]
+
+            # Positions of the profiles reading each bucket, grouped by bucket.
+            members = np.argsort(buckets, kind="stable")
+            memberStart = np.searchsorted(buckets[members], np.arange(len(bucketStart) + 1))
+
+            bucketBounds = np.append(bucketStart, len(pairs))
+            self.index.append(
+                NeighborIndex(
+                    pairIds=pairIds.reshape(-1),
+                    counts=np.bincount(pairIds.reshape(-1), minlength=len(pairs)),
+                    slotPairs=np.arange(len(pairs)),
+                    slotOpponents=pairOpponents,
+                    buckets=buckets.reshape(-1),
+                    bucketBounds=bucketBounds,
+                    bucketStop=bucketBounds[1:].copy(),
+                    bucketDead=np.zeros(len(bucketStart), dtype=np.int64),
+                    members=members,
+                    memberStart=memberStart,
+                )
+            )
+
+    def indexProfile(self, position, count):
+        """
+        Remove (count=-1) a single profile from the neighbor-projection index. Profiles are never added back once
+        removed, since buckets drop the pairs whose count reaches zero.
+
+        Returns the players whose consistent set for this profile's neighbor projection lost a member.
+        """
+        shrunk = []
+        for player, index in enumerate(self.index):
+            pair = index.pairIds[position]
+            index.counts[pair] += count
+            if index.counts[pair] == 0:
+                shrunk.append(player)
+                bucket = index.buckets[position]
+                index.bucketDead[bucket] += 1
+                start, stop = index.bucketBounds[bucket], index.bucketStop[bucket]
+                if 2 * index.bucketDead[bucket] >= stop - start:
+                    self.compactBucket(index, bucket)
+        return shrunk
+
+    def compactBucket(self, index, bucket):
+        """
+        Move the live pairs of bucket to the front of its slots, in order, and drop the dead ones.
+        """
+        start, stop = index.bucketBounds[bucket], index.bucketStop[bucket]
+        pairs = index.slotPairs[start:stop]
+        live = index.counts[pairs] > 0
+        numLive = int(np.count_nonzero(live))
+        index.slotOpponents[start : start + numLive] = index.slotOpponents[start:stop][live]
+        index.slotPairs[start : start + numLive] = pairs[live]
+        index.bucketStop[bucket] = start + numLive
+        index.bucketDead[bucket] = 0
 
-    def consistentStrategies(self, profile, player, profilesToConsider):
+    def consistentStrategies(self, position, player):
         """
         Returns all strategy profiles consistent with the given profile for the given player's strategic information
-        encoded by the network self.network.
+        encoded by the network self.network, as sorted opponent codes. Read from the neighbor-projection index, whose
+        buckets hold at most twice as many pairs as are still alive, so this costs as much as the size of the
+        consistent set.
+        """
+        index = self.index[player]
+        bucket = index.buckets[position]
+        start, stop = index.bucketBounds[bucket], index.bucketStop[bucket]
+        live = index.counts[index.slotPairs[start:stop]] > 0
+        return index.slotOpponents[start:stop][live]
+
+    def dependents(self, position, player):
+        """
+        Positions of the profiles whose check for player reads the same bucket as the profile at position.
+        """
+        index = self.index[player]
+        bucket = index.buckets[position]
+        return index.members[index.memberStart[bucket] : index.memberStart[bucket + 1]]
+
+    def reduceProfiles(self, positions, survives=None, checkpoint=None):
+        """
+        Applies operator B_G to the profiles at positions (into the codes the index was built from).
+
+        The neighbor-projection index must reflect positions; eliminated profiles are removed from it at the end of the
+        sweep. survives holds the results of the first positions when resuming a sweep, and checkpoint(survives) is
+        called with the results so far as the sweep progresses.
         """
+        survives = list(survives or [])
+        if self.workers > 1:
+            survives = self.checkProfilesParallel(positions, survives, checkpoint)
+        else:
+            from tqdm import tqdm
+
+            for position in tqdm(
+                positions[len(survives) :].tolist(),
+                desc="Reducing profiles",
+                disable=not self.verbose,
+            ):
+                if checkpoint is not None:
+                    checkpoint(survives)
+                survives.append(self.checkProfile(position))
+
+        survives = np.array(survives, dtype=bool)
+        for position in positions[~survives].tolist():
+            self.indexProfile(position, -1)
+
+        # If all players are playing a network-consistent best reply, keep the profile in the reduced set.
+        return positions[survives]
 
-        consistent = set()
-        for p in profilesToConsider:
-            if all(profile[i] == p[i] for i in self.network.neighbors(player)):
-                opponents = list(p)[:player] + list(p)[player + 1 :]
-                consistent.add(tuple(opponents))
+    def checkProfile(self, position):
+        """
+        Check if for all players, is everyone playing a network-consistent best reply.
+        """
+        profile = int(self.indexCodes[position])
+        for player in range(self.numPlayers):
+            self.stats["checks"] += 1
+            consistent = self.consistentStrategies(position, player)
 
-        return consistent
+            # Check if there is some viable conjecture (distribution over consistent) where profile_i is a B.R.
+            if not self.checkBestResponse(profile, player, consistent):
+                return False
+        return True
 
-    def reduceProfiles(self, profilesToConsider):
+    def checkProfilesParallel(self, positions, survives=None, checkpoint=None):
         """
-        Applies operator B_G.
+        Runs checkProfile over positions on a pool of self.workers processes and returns the results in order. The
+        solver (payoffs, index of the surviving set and caches) is shipped to each worker once per sweep through the
+        pool initializer; tasks only carry chunk boundaries.
+
+        survives and checkpoint are as in reduceProfiles; the checkpoint is offered after every chunk.
         """
-        reducedProfiles = []
-        for profile in tqdm(
-            profilesToConsider, desc="Reducing profiles", disable=not self.verbose
+        survives = list(survives or [])
+        positions = positions[len(survives) :]
+        chunkSize = self.chunkSize or max(1, len(positions) // (4 * self.workers))
+        bounds = [
+            (start, min(start + chunkSize, len(positions)))
+            for start in range(0, len(positions), chunkSize)
+        ]
+
+        from tqdm import tqdm
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_initSweepWorker,
+            initargs=(self, positions),
+        ) as executor:
+            for chunk, stats, learned in tqdm(
+                executor.map(_checkChunk, bounds),
+                total=len(bounds),
+                desc="Reducing profiles",
+                disable=not self.verbose,
+            ):
+                survives.extend(chunk)
+                for name, count in stats.items():
+                    self.stats[name] += count
+                self.mergeLearned(learned)
+                if checkpoint is not None:
+                    checkpoint(survives)
+        return survives
+
+    def __getstate__(self):
+        # The game wrapper may hold objects that cannot be pickled (e.g. pygambit tables); workers only need the
+        # payoff tensor.
+        state = dict(self.__dict__)
+        state["gameWrapper"] = None
+        state["models"] = OrderedDict()
+        return state
+
+    def reduceIncremental(self, profilesToConsider, orbits=None, resume=None):
+        """
+        Computes the greatest fixpoint of B_G with a worklist instead of full sweeps.
+
+        Profiles are eliminated as soon as a check fails (Gauss-Seidel style). Since B_G is monotone, removing a
+        profile that fails against a superset of the fixpoint never removes a fixpoint profile, so the result is the
+        same as iterating reduceProfiles. When a removal makes some player's bucket lose an opponent sub-profile, only
+        the (profile, player) checks that read that bucket are re-queued.
+
+        orbits (see symmetry.profileOrbits) gives the position of each profile's orbit representative under a symmetry
+        group of the game. Only representatives are checked, and a failing representative takes its whole orbit with
+        it. Since a symmetry may permute the players, a re-queued representative is re-checked for every player.
+
+        resume is the state saved by a checkpoint of this engine on the same profiles.
+        """
+        numPlayers = self.numPlayers
+        self.buildIndex(profilesToConsider)
+
+        if orbits is None:
+            representative = np.arange(len(profilesToConsider))
+            members = None
+        else:
+            representative = np.asarray(orbits, dtype=np.int64)
+            members = {}
+            for position, orbit in enumerate(orbits):
+                members.setdefault(orbit, []).append(position)
+
+        # pending[position, player] marks the checks still to do at a queued representative; a row with no mark is not
+        # in the worklist.
+        if resume is None:
+            surviving = np.ones(len(profilesToConsider), dtype=bool)
+            pending = np.zeros((len(profilesToConsider), numPlayers), dtype=bool)
+            queued = np.unique(representative)
+            pending[queued] = True
+            worklist = deque(queued.tolist())
+            checks = 0
+        else:
+            surviving = resume["surviving"]
+            pending = resume["pending"]
+            worklist = deque(resume["worklist"])
+            checks = resume["checks"]
+            for position in np.flatnonzero(~surviving).tolist():
+                self.indexProfile(position, -1)
+
+        from tqdm import tqdm
+
+        with tqdm(desc="Reducing profiles", disable=not self.verbose) as progress:
+            while worklist:
+                if self.checkpointDue():
+                    self.saveCheckpoint(
+                        {
+                            "engine": "incremental",
+                            "profiles": profilesToConsider,
+                            "orbits": orbits,
+                            "surviving": surviving,
+                            "pending": pending,
+                            "worklist": list(worklist),
+                            "checks": checks,
+                        }
+                    )
+                position = worklist.popleft()
+                players = np.flatnonzero(pending[position]).tolist()
+                pending[position] = False
+                if not surviving[position]:
+                    continue
+
+                profile = int(profilesToConsider[position])
+                for player in players:
+                    checks += 1
+                    consistent = self.consistentStrategies(position, player)
+                    if not self.checkBestResponse(profile, player, consistent):
+                        break
+                else:
+                    progress.update()
+                    continue
+
+                # Eliminate the orbit now and re-queue every check whose consistent set lost a member.
+                for member in [position] if members is None else members[position]:
+                    surviving[member] = False
+                    for shrunkPlayer in self.indexProfile(member, -1):
+                        dependents = representative[self.dependents(member, shrunkPlayer)]
+                        dependents = dependents[surviving[dependents]]
+                        fresh = np.unique(dependents[~pending[dependents].any(axis=1)])
+                        if orbits is None:
+                            pending[dependents, shrunkPlayer] = True
+                        else:
+                            pending[dependents] = True
+                        worklist.extend(fresh.tolist())
+                progress.update()
+
+        self.stats["checks"] += checks
+        return profilesToConsider[surviving]
+
+    def actionUtilities(self, player, opponents):
+        """
+        Returns a (numActions, len(opponents)) array whose [a, j] entry is the utility of player when playing action a
+        against the opponent profile with code opponents[j].
+        """
+        return self.utilityTables[player][:, opponents]
+
+    def classColumns(self, player, consistent):
+        """
+        Returns the sorted ids of the opponent classes of player present among the opponent codes consistent, and the
+        first member of consistent in each of them. Returns None without opponent classes, or if consistent is no
+        larger than the number of classes so that merging does not pay.
+        """
+        if (
+            self.opponentClasses is None
+            or len(consistent) <= self.classUtilities[player].shape[1]
         ):
-            # Check if for all players, is everyone playing a network-consistent best reply.
-            clear = True
-            for player in range(self.gameWrapper.numPlayers):
-                consistent = self.consistentStrategies(
-                    profile, player, profilesToConsider
-                )
+            return None
+        classes = self.opponentClasses[player][consistent]
+        first = np.full(self.classUtilities[player].shape[1], -1)
+        # Later writes win, so writing in reverse leaves the first occurrence of each class.
+        first[classes[::-1]] = np.arange(len(classes) - 1, -1, -1)
+        present = np.flatnonzero(first >= 0)
+        return present, consistent[first[present]]
 
-                # Check if there is some viable conjecture (distribution over consistent) where profile_i is a B.R.
-                isBestResponse = self.checkBestResponse(profile, player, consistent)
-                # print(f"Player {player} is a best response: {isBestResponse}")
-                if not isBestResponse:
-                    break
-            else:
-                # If all players are playing a network-consistent best reply, add the profile to the reduced set.
-                reducedProfiles.append(profile)
+    def columnUtilities(self, player, consistent, classColumns=None):
+        """
+        Returns the opponent codes standing for the columns of the best response LP against the opponent codes
+        consistent, and the (numActions, numColumns) utilities of player against them. Opponent profiles of the same
+        class give identical columns, so given classColumns (see self.classColumns) each class present in consistent
+        becomes a single column, represented by its first member.
+        """
+        if classColumns is None:
+            return consistent, self.actionUtilities(player, consistent)
+        classes, columns = classColumns
+        return columns, self.classUtilities[player][:, classes]
 
-        return reducedProfiles
+    def screenBestResponse(self, action, utilities):
+        """
+        Try to settle the best response LP without building it, from the (numActions, numConsistent) utility matrix.
+
+        Returns True if action is a best reply to some single consistent opponent profile (a pure witness conjecture),
+        False if some other pure action is strictly better against every consistent profile, and None if neither
+        certificate applies and the LP has to be solved.
+        """
+        if np.any(utilities[action] >= utilities.max(axis=0)):
+            return True
+        if np.any(np.all(utilities > utilities[action], axis=1)):
+            return False
+        return None
 
     def checkBestResponse(self, profile, player, consistent):
+        """
+        Determine if there EXISTS some conjecture over opponents actions such that profile[i] is a BR for player i.
+        profile is a profile code and consistent a sorted array of opponent codes.
+
+        The answer depends only on (player, profile[player], consistent), so results are memoized on that key in a
+        bounded LRU shared by every sweep of this solver. consistent enters the key as a 16 byte digest, so entries have
+        a fixed size however large the consistent set is.
+        """
+        if self.memoSize == 0:
+            return self.computeBestResponse(profile, player, consistent)
+
+        key = (
+            player,
+            self.action(profile, player),
+            hashlib.blake2b(consistent.tobytes(), digest_size=16).digest(),
+        )
+        if key in self.memo:
+            self.memo.move_to_end(key)
+            self.stats["memoHits"] += 1
+            return self.memo[key]
+
+        self.stats["memoMisses"] += 1
+        result = self.computeBestResponse(profile, player, consistent)
+        self.remember(key, result)
+        return result
+
+    def remember(self, key, result):
+        self.memo[key] = result
+        if len(self.memo) > self.memoSize:
+            self.memo.popitem(last=False)
+        if self.learned is not None:
+            self.learned.append(("memo", key, result))
+
+    def addWitness(self, key, support):
+        self.witnesses[key] = support
+        if self.learned is not None:
+            self.learned.append(("witness", key, support))
+
+    def mergeLearned(self, learned):
+        """
+        Merge the cache entries a sweep worker recorded in its learned list into this solver's caches.
+        """
+        for kind, key, value in learned:
+            if kind == "memo":
+                self.remember(key, value)
+            elif kind == "witness":
+                self.witnesses[key] = value
+            else:
+                self.addDominator(*key, value)
+
+    def computeBestResponse(self, profile, player, consistent):
         """
         Solve an LP to determine if there EXISTS some conjecture over opponents actions such that profile[i] is a BR
         for player i.
         """
-        # Create the LP
-        # prob = pl.LpProblem("best_response", pl.LpMaximize, presolve=self.presolve)
-        prob = pl.LpProblem("best_response", pl.LpMaximize)
-
-        # Create the variables. Introduce one variable for each consistent strategy profile.
-        variables = []
-        orderedConsistent = list(consistent)
-        for p in orderedConsistent:
-            variables.append(pl.LpVariable(str(p), 0, 1))
-
-        # Create the objective function. The objective is not important as we just care about feasibility.
-        prob += 0
-
-        # Add the probability constraint that all variables must sum to 1.
-        prob += sum(variables) == 1
-
-        # Add the utility constraints. For each possible action of player i, add a constraint that the utility of
-        # player i is at most the utility of profile[i].
-
-        # For a given conjecture over opponents actions (specified by j), compute the utility of player i where i plays action profile[player]
-        action_utility = sum(
-            variables[j]
-            * self.game[
-                orderedConsistent[j][:player]
-                + (profile[player],)
-                + orderedConsistent[j][player:]
-            ][player]
-            for j in range(len(variables))
-        )
+        return self.bestResponseSupport(profile, player, consistent) is not None
 
-        for action in range(self.gameWrapper.numActions):
-            prob += (
-                sum(
-                    variables[j]
-                    * self.game[
-                        orderedConsistent[j][:player]
-                        + (action,)
-                        + orderedConsistent[j][player:]
-                    ][player]
-                    for j in range(len(variables))
+    def bestResponseSupport(self, profile, player, consistent, preferred=None):
+        """
+        Support (as opponent codes, a subset of consistent) of a conjecture over consistent under which profile[player]
+        is a best reply, or None if there is none. Stored witnesses and dominators settle the check where they apply,
+        then the screen, then the LP, whose certificates are stored in turn.
+
+        preferred is a boolean mask over consistent. If it is given, pure witnesses are always screened for, and pure
+        witnesses among the preferred columns come first, so that the self-supporting sets of contains stay small.
+        """
+        action = self.action(profile, player)
+
+        # A stored witness conjecture is still valid while every opponent profile in its support is consistent.
+        witnessKey = (player, action, self.neighborKey(profile, player))
+        support = self.witnesses.get(witnessKey)
+        if support is not None:
+            found = np.searchsorted(consistent, support)
+            if np.all(found < len(consistent)) and np.array_equal(
+                consistent[np.minimum(found, len(consistent) - 1)], support
+            ):
+                self.stats["witnessHits"] += 1
+                return support
+            del self.witnesses[witnessKey]
+
+        # utilities[a, j] is the utility of player i when playing action a against columns[j], which are the consistent
+        # opponent profiles or one representative per opponent class.
+        classColumns = self.classColumns(player, consistent)
+        columns, utilities = self.columnUtilities(player, consistent, classColumns)
+
+        if self.screen or preferred is not None:
+            screened = self.screenBestResponse(action, utilities)
+            if screened is not None:
+                self.stats["screened"] += 1
+                if not screened:
+                    return None
+                support = self.pureWitness(
+                    player,
+                    action,
+                    consistent,
+                    columns,
+                    utilities,
+                    classColumns,
+                    preferred,
                 )
-                <= action_utility
-            )
+                if self.reuseCertificates:
+                    self.addWitness(witnessKey, support)
+                return support
 
-        # Solve the LP
-        prob.solve(self.solver)
+        # differences[a, j] is how much player i gains by deviating to a against columns[j].
+        differences = utilities - utilities[action]
 
-        # If the LP is infeasible, then there is no conjecture over opponents actions such that profile[i] is a BR.
-        if prob.status == -1:
-            return False
+        # A mixture that dominated this action on an earlier consistent set still dominates it on every subset.
+        dominators = self.dominators.get((player, action))
+        if dominators is not None:
+            margins = dominators @ differences
+            if np.any(np.all(margins > self.tolerance, axis=1)):
+                self.stats["dominatorHits"] += 1
+                return None
 
-        return True
+        self.stats["lpSolves"] += 1
+        if self.generatesColumns(differences):
+            result = self.solveColumns(differences)
+        elif classColumns is None:
+            result = self.solveModel(witnessKey + (False,), consistent, differences)
+        else:
+            result = self.solveModel(witnessKey + (True,), classColumns[0], differences)
 
-    def solve(self):
-        """ """
+        if not result.feasible:
+            if self.reuseCertificates:
+                self.addDominator(player, action, result.dominator)
+            return None
+        support = columns[result.conjecture > self.tolerance]
+        if self.reuseCertificates:
+            self.addWitness(witnessKey, support)
+        return support
+
+    def pureWitness(
+        self, player, action, consistent, columns, utilities, classColumns, preferred=None
+    ):
+        """
+        A single opponent profile of consistent against which action is a best reply, found by the screen. Profiles
+        marked in preferred come first.
+        """
+        pure = utilities[action] >= utilities.max(axis=0)
+        if preferred is not None:
+            if classColumns is None:
+                members = pure & preferred
+            else:
+                # Map every member of consistent to the column of its class.
+                classes = self.opponentClasses[player][consistent]
+                members = pure[np.searchsorted(classColumns[0], classes)] & preferred
+            if np.any(members):
+                return consistent[[np.argmax(members)]]
+        return columns[[np.argmax(pure)]]
+
+    def addDominator(self, player, action, dominator):
+        """
+        Stack dominator onto the stored dominators of (player, action), unless an equal one is stored already. Only the
+        dominatorCacheSize most recent ones are kept.
+        """
+        if self.learned is not None:
+            self.learned.append(("dominator", (player, action), dominator))
+        stored = self.dominators.get((player, action))
+        if stored is None:
+            self.dominators[(player, action)] = dominator[None, :]
+        elif not np.any(np.all(np.abs(stored - dominator) <= self.tolerance, axis=1)):
+            self.dominators[(player, action)] = np.vstack([stored, dominator])[
+                -self.dominatorCacheSize :
+            ]
+
+    def generatesColumns(self, differences):
+        return (
+            self.columnGeneration is not None
+            and differences.shape[1] > self.columnGeneration
+        )
+
+    def solveColumns(self, differences):
+        """
+        Solve the best response LP of differences by column generation (see LPBackend.solveColumns).
+        """
+        result, rounds = self.backend.solveColumns(
+            differences, self.columnBatch, self.tolerance
+        )
+        self.stats["pricingRounds"] += rounds
+        return result
+
+    def solveModel(self, key, columnIds, differences):
+        """
+        Solve the best response LP of differences, whose columns are named by the sorted array columnIds. If the model
+        stored under key was solved on a superset of columnIds, the missing columns are fixed to zero and the model is
+        re-solved from its last basis instead of from scratch.
+        """
+        if self.modelCacheSize == 0 or not hasattr(self.backend, "model"):
+            return self.backend.solve(differences, self.reuseCertificates)
+
+        model = self.models.pop(key, None)
+        if model is not None and np.all(np.isin(columnIds, model.columnIds)):
+            model.restrict(columnIds)
+            self.stats["warmSolves"] += 1
+        else:
+            model = self.backend.model(differences, columnIds)
+        self.models[key] = model
+        if len(self.models) > self.modelCacheSize:
+            self.models.popitem(last=False)
+        return model.result()
+
+    def rationalizableActions(self):
+        """
+        Iterated elimination of never-best-responses. An action of player i is removed if there is no conjecture over
+        the surviving actions of the other players under which it is a best reply. Conjectures may be correlated, the
+        same as in checkBestResponse, so every PCE profile is built from actions that survive.
+
+        Returns a list holding the surviving actions of each player.
+        """
+        numPlayers = self.numPlayers
+        actionSets = [list(range(self.numActions)) for _ in range(numPlayers)]
+
+        changed = True
+        while changed:
+            changed = False
+            for player in range(numPlayers):
+                # Opponent codes of every combination of the other players' surviving actions, in sorted order.
+                others = actionSets[:player] + actionSets[player + 1 :]
+                opponents = (
+                    np.array(list(itertools.product(*others)), dtype=np.int64).reshape(
+                        -1, numPlayers - 1
+                    )
+                    @ self.radix[1:]
+                )
+                # Only profile[player] matters to checkBestResponse.
+                surviving = [
+                    action
+                    for action in actionSets[player]
+                    if self.checkBestResponse(
+                        action * int(self.radix[player]), player, opponents
+                    )
+                ]
+                if len(surviving) < len(actionSets[player]):
+                    actionSets[player] = surviving
+                    changed = True
+
+        if self.verbose:
+            print("Rationalizable actions: {}".format(actionSets))
+        return actionSets
+
+    def reduceSweeps(self, profilesToConsider, resume=None):
+        """
+        Computes the greatest fixpoint of B_G by applying reduceProfiles until nothing changes.
+
+        resume is the state saved by a checkpoint of this engine on the same profiles, which restarts the interrupted
+        sweep after its last checked profile.
+        """
+        self.buildIndex(profilesToConsider)
+        positions = np.arange(len(profilesToConsider))
         previous_size = float("inf")
-        current_size = len(self.profiles)
+        current_size = len(positions)
         step = 0
+        survives = None
+        if resume is not None:
+            positions, step, survives = resume["positions"], resume["step"] - 1, resume["survives"]
+            removed = np.ones(len(profilesToConsider), dtype=bool)
+            removed[positions] = False
+            for position in np.flatnonzero(removed).tolist():
+                self.indexProfile(position, -1)
+            current_size = len(positions)
+
+        def checkpoint(survives):
+            if self.checkpointDue():
+                self.saveCheckpoint(
+                    {
+                        "engine": "sweeps",
+                        "profiles": profilesToConsider,
+                        "orbits": None,
+                        "positions": positions,
+                        "step": step,
+                        "survives": list(survives),
+                    }
+                )
+
         while previous_size - current_size > 0:
             step += 1
             if self.verbose:
                 print("====================================")
                 print("Starting Step {}".format(step))
             previous_size = current_size
-            self.profiles = self.reduceProfiles(self.profiles)
-            current_size = len(self.profiles)
+            positions = self.reduceProfiles(positions, survives, checkpoint)
+            survives = None
+            current_size = len(positions)
             if self.verbose:
                 print(
                     "Reduced from {} to {} profiles".format(previous_size, current_size)
                 )
                 print("====================================")
+        return profilesToConsider[positions]
+
+    def contains(self, predicate, maxChecks=None):
+        """
+        Decide whether the PCE contains a profile satisfying predicate (a function of a profile tuple) without
+        computing the whole fixpoint.
+
+        Any set S with S subset of B_G(S) lies inside the PCE, so a candidate profile is confirmed by growing such a
+        self-supporting set around it: every (profile, player) check in S is solved against the consistent set of the
+        current universe U (a superset of the PCE), and the opponent profiles in the support of its conjecture are added
+        to S. Since consistent sets only grow with S, the conjecture stays valid, and S is finished once every check
+        has one. A check that fails against U proves its profile is not in the PCE; the profile is removed from U and
+        S, and the checks that relied on it are redone. If the candidate itself fails the next one is tried, and if no
+        candidate is left in U, the PCE has none.
+
+        After maxChecks best response checks (default: one per player and profile) the search gives up and falls back
+        to solve(), started from what is left of U.
+
+        Returns (found, witness), where witness is a self-supporting set of profiles containing one satisfying
+        predicate (the whole PCE after a fallback), or None if nothing was found.
+        """
+        codes = self.profiles
+        if self.rationalize:
+            codes = np.intersect1d(
+                codes,
+                self.encode(list(itertools.product(*self.rationalizableActions()))),
+            )
+        if maxChecks is None:
+            maxChecks = self.numPlayers * len(codes)
+
+        self.buildIndex(codes)
+        alive = np.ones(len(codes), dtype=bool)
+        candidates = deque(
+            position
+            for position, profile in enumerate(self.decode(codes))
+            if predicate(profile)
+        )
+        checks = 0
+
+        while candidates and checks < maxChecks:
+            candidate = candidates[0]
+            if not alive[candidate]:
+                candidates.popleft()
+                continue
+
+            # Grow S from the candidate until every check has a conjecture. supported[q] lists the checks whose
+            # conjecture uses the profile at q, to be redone if q turns out not to be in the PCE.
+            witness = {candidate}
+            supported = {}
+            obligations = deque((candidate, player) for player in range(self.numPlayers))
+            while obligations and checks < maxChecks:
+                position, player = obligations.popleft()
+                if position not in witness:
+                    continue
+                checks += 1
+                consistent = self.consistentStrategies(position, player)
+                members = codes[np.fromiter(witness, dtype=np.int64, count=len(witness))]
+                support = self.bestResponseSupport(
+                    int(codes[position]),
+                    player,
+                    consistent,
+                    np.isin(consistent, self.opponentCodes(members, player)),
+                )
+                if support is None:
+                    alive[position] = False
+                    self.indexProfile(position, -1)
+                    if position == candidate:
+                        break
+                    witness.discard(position)
+                    obligations.extend(supported.pop(position, []))
+                    continue
+                for opponents in support.tolist():
+                    added = self.supportProfile(codes, alive, witness, position, player, opponents)
+                    supported.setdefault(added, []).append((position, player))
+                    if added not in witness:
+                        witness.add(added)
+                        obligations.extend((added, i) for i in range(self.numPlayers))
+
+            if alive[candidate] and not obligations:
+                self.stats["checks"] += checks
+                if self.verbose:
+                    print(
+                        "Found a self-supporting set of {} profiles after {} checks".format(
+                            len(witness), checks
+                        )
+                    )
+                return True, self.decode(codes[sorted(witness)])
+
+        self.stats["checks"] += checks
+        if not candidates:
+            if self.verbose:
+                print("No candidate profile is left after {} checks".format(checks))
+            return False, None
+
+        # Out of budget: the remaining universe still contains the PCE, so the full solve can start from it.
+        if self.verbose:
+            print("Falling back to a full solve after {} checks".format(checks))
+        self.profiles = codes[alive]
+        pce = self.solve()
+        if any(predicate(profile) for profile in pce):
+            return True, pce
+        return False, None
+
+    def supportProfile(self, codes, alive, witness, position, player, opponents):
+        """
+        Position of a profile in the universe with opponent sub-profile opponents for player. Such a profile has the
+        same neighbor projection as the profile at position, so it supports player's conjecture there. Profiles already
+        in witness come first, then the one keeping player's action from the profile at position.
+        """
+        radix = int(self.radix[player])
+        high, low = divmod(opponents, radix)
+        base = high * radix * self.numActions + low
+        own = self.action(int(codes[position]), player)
+        options = []
+        for action in [own] + [a for a in range(self.numActions) if a != own]:
+            found = int(np.searchsorted(codes, base + action * radix))
+            if found < len(codes) and codes[found] == base + action * radix and alive[found]:
+                if found in witness:
+                    return found
+                options.append(found)
+        return options[0]
+
+    def fingerprint(self):
+        """
+        Identity of the problem this solver works on, stored with checkpoints so that one is never resumed on another
+        game or network.
+        """
+        return gameKey(self.payoffs), graphKey(self.network)
+
+    def checkpointDue(self):
+        return (
+            self.checkpointPath is not None
+            and time.monotonic() - self.lastCheckpoint >= self.checkpointInterval
+        )
+
+    def saveCheckpoint(self, state):
+        """
+        Atomically write state, together with the LP caches and counters, to self.checkpointPath. The pickle is written
+        to a temporary file next to it and moved into place, so a crash mid-write leaves the previous checkpoint intact.
+        """
+        checkpoint = {
+            "fingerprint": self.fingerprint(),
+            "state": state,
+            "stats": self.stats,
+            "memo": self.memo,
+            "dominators": self.dominators,
+            "witnesses": self.witnesses,
+        }
+        temporary = "{}.tmp".format(self.checkpointPath)
+        with open(temporary, "wb") as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.checkpointPath)
+        self.lastCheckpoint = time.monotonic()
         if self.verbose:
-            print("Exited with {} profiles".format(current_size))
+            print("Saved checkpoint to {}".format(self.checkpointPath))
 
+    def loadCheckpoint(self):
+        """
+        Restore the LP caches and counters from self.checkpointPath and return the saved fixpoint state, or None if
+        there is no checkpoint for this problem.
+        """
+        if self.checkpointPath is None or not os.path.exists(self.checkpointPath):
+            return None
+        with open(self.checkpointPath, "rb") as f:
+            checkpoint = pickle.load(f)
+        if checkpoint["fingerprint"] != self.fingerprint():
+            print(
+                "Ignoring checkpoint {} of a different game or network".format(
+                    self.checkpointPath
+                )
+            )
+            return None
+
+        self.stats.update(checkpoint["stats"])
+        self.memo = checkpoint["memo"]
+        self.dominators = checkpoint["dominators"]
+        self.witnesses = checkpoint["witnesses"]
+        if self.verbose:
+            print("Resuming from checkpoint {}".format(self.checkpointPath))
+        return checkpoint["state"]
+
+    def resultOptions(self):
+        """
+        The options that can change the PCE set this solver returns, used to address results in a PCEStore.
+        """
+        return {"solver": self.solverName, "tolerance": self.tolerance}
+
+    def prepareProfiles(self):
+        """
+        Restrict self.profiles to rationalizable actions and find the symmetry orbits, as configured. Returns the orbits
+        (see symmetry.profileOrbits), or None without symmetries.
+        """
+        if self.rationalize:
+            self.profiles = np.intersect1d(
+                self.profiles,
+                self.encode(list(itertools.product(*self.rationalizableActions()))),
+            )
+
+        orbits = None
+        if self.symmetry:
+            generators = self.symmetry
+            if generators is True:
+                generators = detectSymmetries(self.payoffs, self.network)
+            else:
+                for playerPerm, actionPerm in generators:
+                    assert isSymmetry(
+                        self.payoffs, playerPerm, actionPerm, self.network
+                    ), "({}, {}) is not a symmetry of the game!".format(
+                        playerPerm, actionPerm
+                    )
+            # An initial profile set need not be closed under the symmetries, but the part of it that is still holds the
+            # PCE.
+            self.profiles = self.profiles[
+                closedSubset(self.digits(self.profiles), generators, self.numActions)
+            ]
+            orbits = profileOrbits(
+                self.digits(self.profiles), generators, self.numActions
+            )
+            if self.verbose:
+                print(
+                    "Found {} symmetry generators, {} orbits".format(
+                        len(generators), len(set(orbits))
+                    )
+                )
+        return orbits
+
+    def solve(self):
+        """ """
+        self.lastCheckpoint = time.monotonic()
+        resume = self.loadCheckpoint()
+        if resume is None:
+            orbits = self.prepareProfiles()
+            incremental = self.incremental and self.workers == 1 or orbits is not None
+            if orbits is not None and self.workers > 1:
+                print("Ignoring workers={}: symmetry needs the serial worklist engine".format(self.workers))
+        else:
+            # The checkpoint already holds the profiles left after rationalization and the symmetry orbits.
+            self.profiles, orbits = resume["profiles"], resume["orbits"]
+            incremental = resume["engine"] == "incremental"
+
+        if incremental:
+            self.profiles = self.reduceIncremental(self.profiles, orbits, resume)
+        else:
+            self.profiles = self.reduceSweeps(self.profiles, resume)
+
+        if self.verbose:
+            print(
+                "Exited with {} profiles after {} checks".format(
+                    len(self.profiles), self.stats["checks"]
+                )
+            )
+            print(
+                "Skipped {} LPs by screening, solved {}".format(
+                    self.stats["screened"], self.stats["lpSolves"]
+                )
+            )
+            print(
+                "Memo hits: {}, misses: {}".format(
+                    self.stats["memoHits"], self.stats["memoMisses"]
+                )
+            )
+            print(
+                "Rejected {} checks with cached dominators, confirmed {} with cached witnesses".format(
+                    self.stats["dominatorHits"], self.stats["witnessHits"]
+                )
+            )
+            print("Re-solved {} LPs warm from a stored model".format(self.stats["warmSolves"]))
+            print("Ran {} column generation pricing rounds".format(self.stats["pricingRounds"]))
+
+        pce = self.decode(self.profiles)
+        self.writeResult(pce)
+
+        if self.checkpointPath is not None and os.path.exists(self.checkpointPath):
+            os.remove(self.checkpointPath)
+        return pce
+
+    def writeResult(self, pce):
+        """
+        Pickle (numPlayers, numActions, network, pce) to self.writePath, if set.
+        """
         if self.writePath is not None:
             # Save as a pickle file the gameWrapper object, network, and final profiles
             if self.verbose:
@@ -184,10 +1183,10 @@ class DiscreteSolver:
                 with open(self.writePath, "wb") as f:
                     pickle.dump(
                         (
-                            self.gameWrapper.numPlayers,
-                            self.gameWrapper.numActions,
+                            self.numPlayers,
+                            self.numActions,
                             self.network,
-                            self.profiles,
+                            pce,
                         ),
                         f,
                     )
@@ -195,10 +1194,32 @@ class DiscreteSolver:
                     print("Saved 🎊🎉☀️⛱️🍉!")
             except Exception as e:
                 print("Failed to save ⛈️ due to: {}".format(e))
-        return self.profiles
+
+
+# State of a sweep worker process, set once per sweep by _initSweepWorker.
+_sweepSolver = None
+_sweepPositions = None
+
+
+def _initSweepWorker(solver, positions):
+    global _sweepSolver, _sweepPositions
+    _sweepSolver = solver
+    _sweepPositions = positions
+
+
+def _checkChunk(bounds):
+    start, stop = bounds
+    before = dict(_sweepSolver.stats)
+    _sweepSolver.learned = []
+    survives = [
+        _sweepSolver.checkProfile(p) for p in _sweepPositions[start:stop].tolist()
+    ]
+    stats = {name: count - before[name] for name, count in _sweepSolver.stats.items()}
+    return survives, stats, _sweepSolver.learned
 
 
 if __name__ == "__main__":
+    import networkx as nx
     from potluck import PotluckGame, PotluckArgs
 
     # game = PotluckGame(5)
@@ -0,0 +1,375 @@
+"""
+LP backends for the best response feasibility problem solved by DiscreteSolver.
+
+Every backend receives the payoff difference matrix D of shape (numActions, numConsistent), where
+D[a, j] = u_i(a, p_j) - u_i(profile_i, p_j), and decides whether there is a conjecture x over the consistent opponent
+profiles (x >= 0, sum(x) = 1) with D x <= 0, i.e. one under which profile_i is a best reply.
+
+By Farkas' lemma the problem is infeasible exactly when some mixed strategy y over the player's actions has y D > 0 in
+every column, i.e. y strictly dominates profile_i on the consistent set. Backends return that mixture alongside an
+infeasible answer when asked to (wantDominator), so the solver can reuse it.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+
+LPResult = namedtuple("LPResult", ["feasible", "conjecture", "dominator"])
+
+
+class LPBackend:
+    """
+    Base class for LP backends. Subclasses implement solve(differences, wantDominator) and return an LPResult whose
+    conjecture is the witness distribution over the columns of differences when the problem is feasible, and whose
+    dominator is a dominating mixture over the rows of differences when it is not (None otherwise). Backends that
+    need extra work for the dominator may skip it unless wantDominator is set.
+    """
+
+    def solve(self, differences, wantDominator=False):
+        raise NotImplementedError
+
+    def solveColumns(self, differences, batchSize=32, tolerance=1e-9):
+        """
+        Column generation for LPs with many more columns than rows. Solves the restricted LP on a small set of columns
+        and prices the rest with its dominator y: a column j with y D[:, j] <= tolerance is one on which y fails to
+        dominate, so the batchSize most violating ones join the restricted LP. A feasible restricted LP is feasible for
+        all columns, and a dominator that no column violates proves infeasibility.
+
+        Returns an LPResult over all columns of differences and the number of restricted LPs solved.
+        """
+        numColumns = differences.shape[1]
+
+        # Start from the columns where profile_i loses the least to its best deviation.
+        worst = differences.max(axis=0)
+        support = np.arange(numColumns)
+        if numColumns > batchSize:
+            support = np.sort(np.argpartition(worst, batchSize - 1)[:batchSize])
+        rounds = 0
+        while True:
+            rounds += 1
+            result = self.solve(differences[:, support], wantDominator=True)
+            if result.feasible:
+                conjecture = np.zeros(numColumns)
+                conjecture[support] = result.conjecture
+                return LPResult(True, conjecture, None), rounds
+
+            prices = result.dominator @ differences
+            violating = np.setdiff1d(np.flatnonzero(prices <= tolerance), support)
+            if len(violating) == 0:
+                return result, rounds
+            if len(violating) > batchSize:
+                cheapest = np.argpartition(prices[violating], batchSize - 1)[:batchSize]
+                violating = violating[cheapest]
+            support = np.union1d(support, violating)
+
+
+class PulpBackend(LPBackend):
+    """
+    Builds the LP with PuLP and hands it to one of PuLP's solvers (e.g. PULP_CBC_CMD). Command line solvers write the
+    problem to disk and start a new process for every call, so this is the slowest backend for small LPs.
+
+    Constraints are built straight from the rows of the difference matrix, keeping only nonzero coefficients, over a
+    pool of variables that is shared by every LP this backend solves. This avoids creating new variables, names and
+    intermediate PuLP expressions for every check.
+    """
+
+    def __init__(self, solver="PULP_CBC_CMD", msg=False, threads=1):
+        import pulp
+
+        self.pl = pulp
+        self.solver = pulp.getSolver(solver, msg=msg, threads=threads)
+        self.pools = {}
+
+    def __getstate__(self):
+        # Modules cannot be pickled, so the solver can still be shipped to worker processes under spawn/forkserver.
+        state = dict(self.__dict__)
+        del state["pl"]
+        return state
+
+    def __setstate__(self, state):
+        import pulp
+
+        self.__dict__.update(state)
+        self.pl = pulp
+
+    def variables(self, prefix, count, lower=0, upper=1):
+        """
+        The first count variables of the pool named prefix, creating missing ones.
+        """
+        pool = self.pools.setdefault(prefix, [])
+        for j in range(len(pool), count):
+            pool.append(self.pl.LpVariable("{}{}".format(prefix, j), lower, upper))
+        return pool[:count]
+
+    def constraint(self, variables, coefficients, sense, rhs=0):
+        """
+        The constraint sum_j coefficients[j] * variables[j] (sense) rhs, or None if every coefficient is zero.
+        """
+        pl = self.pl
+        nonzero = np.flatnonzero(coefficients)
+        if len(nonzero) == 0:
+            return None
+        expression = pl.LpAffineExpression(
+            [(variables[j], c) for j, c in zip(nonzero.tolist(), coefficients[nonzero].tolist())]
+        )
+        return pl.LpConstraint(expression, sense=sense, rhs=rhs)
+
+    def addConstraints(self, prob, constraints):
+        for constraint in constraints:
+            if constraint is not None:
+                prob.addConstraint(constraint)
+
+    def solve(self, differences, wantDominator=False):
+        pl = self.pl
+        prob = pl.LpProblem("best_response", pl.LpMaximize)
+
+        # Introduce one variable for each consistent strategy profile.
+        numActions, numConsistent = differences.shape
+        variables = self.variables("x", numConsistent)
+
+        # The objective is not important as we just care about feasibility.
+        prob += 0
+        self.addConstraints(
+            prob,
+            [self.constraint(variables, np.ones(numConsistent), pl.LpConstraintEQ, 1)]
+            + [self.constraint(variables, row, pl.LpConstraintLE) for row in differences],
+        )
+
+        prob.solve(self.solver)
+
+        # If the LP is infeasible, then there is no conjecture over opponents actions such that profile[i] is a BR.
+        # The dominator takes a second LP (and CBC process), so it is only solved on request.
+        if prob.status == -1:
+            dominator = self.solveDominator(differences) if wantDominator else None
+            return LPResult(False, None, dominator)
+        return LPResult(True, np.array([v.varValue or 0.0 for v in variables]), None)
+
+    def solveDominator(self, differences):
+        """
+        Solve the Farkas alternative max t s.t. y D >= t, y in the simplex, for the dominating mixture y.
+        """
+        pl = self.pl
+        prob = pl.LpProblem("dominator", pl.LpMaximize)
+        numActions, numConsistent = differences.shape
+
+        # Columns of [D^T | -1] over the variables [y | t].
+        variables = self.variables("y", numActions) + self.variables("t", 1, None, None)
+        margin = variables[-1]
+        prob += margin
+        self.addConstraints(
+            prob,
+            [
+                self.constraint(
+                    variables, np.append(np.ones(numActions), 0.0), pl.LpConstraintEQ, 1
+                )
+            ]
+            + [
+                self.constraint(variables, np.append(column, -1.0), pl.LpConstraintGE)
+                for column in differences.T
+            ],
+        )
+
+        prob.solve(self.solver)
+        return np.array([w.varValue or 0.0 for w in variables[:-1]])
+
+
+class HighsBackend(LPBackend):
+    """
+    Solves the LP in-process with the HiGHS solver shipped with SciPy.
+    """
+
+    def __init__(self, tolerance=1e-9):
+        from scipy.optimize import linprog
+
+        self.linprog = linprog
+        self.tolerance = tolerance
+
+    def solve(self, differences, wantDominator=False):
+        """
+        Solves min v s.t. D x <= v, x in the simplex, which is always feasible. The original problem is feasible when
+        v <= 0, and otherwise the duals of D x <= v form the dominating mixture.
+        """
+        numActions, numConsistent = differences.shape
+        objective = np.zeros(numConsistent + 1)
+        objective[-1] = 1.0
+        equality = np.ones((1, numConsistent + 1))
+        equality[0, -1] = 0.0
+        result = self.linprog(
+            objective,
+            A_ub=np.hstack([differences, -np.ones((numActions, 1))]),
+            b_ub=np.zeros(numActions),
+            A_eq=equality,
+            b_eq=np.ones(1),
+            bounds=[(0, None)] * numConsistent + [(None, None)],
+            method="highs",
+        )
+        if result.x[-1] > self.tolerance:
+            dominator = -result.ineqlin.marginals
+            return LPResult(False, None, dominator / dominator.sum())
+        return LPResult(True, result.x[:-1], None)
+
+
+class SimplexBackend(LPBackend):
+    """
+    Dense tableau simplex for the small LPs produced by best response checks, run entirely in NumPy.
+
+    The feasibility problem is solved as the zero-sum game min_x max_a (D x)_a. After shifting D to a strictly
+    positive matrix M, the game becomes the standard form LP max sum(u) s.t. M u <= 1, u >= 0, whose slack basis is
+    feasible from the start so no phase one is needed. The tableau has one row per action, which keeps pivots cheap.
+
+    model() returns the solved tableau as a SimplexModel, which can drop columns and re-solve from its last basis.
+    """
+
+    def __init__(self, tolerance=1e-9, maxPivots=10000):
+        self.tolerance = tolerance
+        self.maxPivots = maxPivots
+
+    def solve(self, differences, wantDominator=False):
+        return self.model(differences).result()
+
+    def solveGame(self, differences):
+        """
+        Returns the value of the game min_x max_a (D x)_a, the minimizing conjecture x and the maximizing mixture y,
+        which is read off the objective row under the slack columns.
+        """
+        return self.model(differences).solution()
+
+    def model(self, differences, columnIds=None):
+        """
+        Solve the LP of differences and keep its tableau. columnIds names the columns of differences (by default
+        0..numColumns-1) for SimplexModel.restrict.
+        """
+        return SimplexModel(self, differences, columnIds)
+
+
+class SimplexModel:
+    """
+    Optimal tableau of SimplexBackend's LP for the columns columnIds of a difference matrix.
+
+    restrict() fixes the variables of dropped columns to zero and re-solves warm. Dropping columns keeps the objective
+    row dual feasible, so a few dual simplex pivots from the previous basis restore optimality instead of a cold solve.
+    """
+
+    def __init__(self, backend, differences, columnIds=None):
+        self.tolerance = backend.tolerance
+        self.maxPivots = backend.maxPivots
+        self.numActions, numColumns = differences.shape
+        self.columnIds = np.arange(numColumns) if columnIds is None else np.asarray(columnIds)
+        self.shift = 1.0 - differences.min()
+
+        # Tableau [M | I | 1] with the objective row [-1 | 0 | 0] underneath.
+        numActions = self.numActions
+        tableau = np.zeros((numActions + 1, numColumns + numActions + 1))
+        tableau[:numActions, :numColumns] = differences + self.shift
+        tableau[:numActions, numColumns:-1] = np.eye(numActions)
+        tableau[:numActions, -1] = 1.0
+        tableau[-1, :numColumns] = -1.0
+        self.tableau = tableau
+        self.basis = list(range(numColumns, numColumns + numActions))
+        self.pivots = 0
+        self.primal()
+
+    def pivot(self, row, column):
+        tableau = self.tableau
+        tableau[row] /= tableau[row, column]
+        others = np.arange(len(tableau)) != row
+        tableau[others] -= np.outer(tableau[others, column], tableau[row])
+        self.basis[row] = column
+        self.pivots += 1
+        if self.pivots > self.maxPivots:
+            raise RuntimeError("Simplex did not converge in {} pivots".format(self.maxPivots))
+
+    def primal(self):
+        """
+        Primal simplex with Bland's rule from a primal feasible basis.
+        """
+        tableau = self.tableau
+        while True:
+            # Bland's rule: enter the first column with a negative reduced cost.
+            candidates = np.flatnonzero(tableau[-1, :-1] < -self.tolerance)
+            if len(candidates) == 0:
+                return
+            column = candidates[0]
+
+            rows = np.flatnonzero(tableau[:-1, column] > self.tolerance)
+            ratios = tableau[rows, -1] / tableau[rows, column]
+            best = rows[ratios <= ratios.min() + self.tolerance]
+            self.pivot(min(best, key=lambda r: self.basis[r]), column)
+
+    def dual(self):
+        """
+        Dual simplex from a dual feasible basis: pivot out the most negative basic variable until the basis is primal
+        feasible again.
+        """
+        tableau = self.tableau
+        while True:
+            row = np.argmin(tableau[:-1, -1])
+            if tableau[row, -1] >= -self.tolerance:
+                return
+            columns = np.flatnonzero(tableau[row, :-1] < -self.tolerance)
+            ratios = tableau[-1, columns] / -tableau[row, columns]
+            self.pivot(row, columns[np.argmin(ratios)])
+
+    def restrict(self, columnIds):
+        """
+        Drop every column whose id is not in columnIds (which must be a subset of the current ids) and re-solve.
+        """
+        keep = np.isin(self.columnIds, columnIds)
+        if keep.all():
+            return
+        dropped = np.flatnonzero(~keep)
+        numColumns = len(self.columnIds)
+        tableau = self.tableau
+
+        # Move dropped basic variables to their new upper bound 0 through a column that is kept. The dual ratio test
+        # keeps the reduced costs of the kept columns nonnegative.
+        allowed = np.ones(tableau.shape[1] - 1, dtype=bool)
+        allowed[dropped] = False
+        for row, column in enumerate(list(self.basis)):
+            if column < numColumns and not keep[column]:
+                entering = np.flatnonzero(allowed & (tableau[row, :-1] > self.tolerance))
+                ratios = tableau[-1, entering] / tableau[row, entering]
+                self.pivot(row, entering[np.argmin(ratios)])
+
+        # Dropped columns are all nonbasic now, delete them and renumber the basis.
+        remaining = np.append(allowed, True)
+        position = np.cumsum(remaining) - 1
+        self.tableau = tableau[:, remaining]
+        self.basis = [int(position[column]) for column in self.basis]
+        self.columnIds = self.columnIds[keep]
+
+        self.dual()
+        self.primal()
+
+    def solution(self):
+        """
+        Returns the value of the game, the conjecture over the current columns and the dominating mixture, as in
+        SimplexBackend.solveGame.
+        """
+        numColumns = len(self.columnIds)
+        u = np.zeros(numColumns + self.numActions)
+        u[self.basis] = self.tableau[:-1, -1]
+        total = self.tableau[-1, -1]
+        dominator = self.tableau[-1, numColumns:-1] / total
+        return 1.0 / total - self.shift, u[:numColumns] / total, dominator
+
+    def result(self):
+        value, conjecture, dominator = self.solution()
+        if value > self.tolerance:
+            return LPResult(False, None, dominator)
+        return LPResult(True, conjecture, None)
+
+
+def getBackend(solver, msg=False, threads=1):
+    """
+    Returns an LPBackend for the given name. "HIGHS" and "SIMPLEX" select the in-process backends, any other name is
+    passed on to PuLP. LPBackend instances are returned unchanged.
+    """
+    if isinstance(solver, LPBackend):
+        return solver
+    if solver == "HIGHS":
+        return HighsBackend()
+    if solver == "SIMPLEX":
+        return SimplexBackend()
+    return PulpBackend(solver, msg=msg, threads=threads)
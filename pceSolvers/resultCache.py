@@ -0,0 +1,128 @@
+"""
+Isomorphism-aware cache of solved PCE sets.
+
+Sweeps over random or enumerated graphs keep solving the same game on graphs that are isomorphic to ones already
+solved. If the game is symmetric in the players, relabeling the players through a graph isomorphism maps one PCE set
+onto the other, so the stored answer can be reused.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+def gameKey(payoffs):
+    """
+    Identity of a game: a hash of its payoff tensor.
+    """
+    payoffs = np.ascontiguousarray(payoffs, dtype=float)
+    return (payoffs.shape, hashlib.sha1(payoffs.tobytes()).hexdigest())
+
+
+def isPlayerSymmetric(payoffs):
+    """
+    Check if payoffs are invariant under every permutation of the players, using the transposition (0 1) and the
+    cycle (0 1 ... n-1), which generate all permutations.
+    """
+    from pceSolvers.symmetry import isSymmetry
+
+    numPlayers, numActions = payoffs.shape[0], payoffs.shape[1]
+    actions = list(range(numActions))
+    if numPlayers < 2:
+        return True
+    swap = [1, 0] + list(range(2, numPlayers))
+    cycle = list(range(1, numPlayers)) + [0]
+    return isSymmetry(payoffs, swap, actions) and isSymmetry(payoffs, cycle, actions)
+
+
+class PCECache:
+    """
+    Maps (game identity, graph up to isomorphism) to the PCE set of the game on that graph.
+
+    Graphs are bucketed by an isomorphism invariant (the multiset of node degrees together with their neighbors'
+    degrees) and matched inside a bucket with VF2. For games that are not symmetric in the players only identical
+    graphs are matched.
+
+    At most maxSize graphs are kept; the least recently used one is evicted first.
+    """
+
+    def __init__(self, maxSize=10000):
+        self.maxSize = maxSize
+        # buckets[bucketKey] maps entry ids to (graph, profiles); entries maps entry ids to their bucket key, least
+        # recently used first.
+        self.buckets = {}
+        self.entries = OrderedDict()
+        self.nextId = 0
+        self.hits = 0
+        self.misses = 0
+
+    def bucketKey(self, key, network, symmetric):
+        if not symmetric:
+            return key, tuple(sorted(tuple(sorted(e)) for e in network.edges()))
+        degree = dict(network.degree())
+        invariant = sorted(
+            (degree[node], tuple(sorted(degree[n] for n in network.neighbors(node))))
+            for node in network.nodes()
+        )
+        return key, tuple(invariant)
+
+    def lookup(self, key, network, symmetric, countMiss=True):
+        """
+        Returns the cached PCE set for network relabeled onto its nodes, or None on a miss. countMiss=False leaves a
+        miss out of the hit rate, for lookups that are followed by another one for the same query.
+        """
+        import networkx as nx
+
+        bucket = self.buckets.get(self.bucketKey(key, network, symmetric), {})
+        for entryId, (graph, profiles) in bucket.items():
+            if not symmetric:
+                mapping = {node: node for node in graph.nodes()}
+            else:
+                matcher = nx.algorithms.isomorphism.GraphMatcher(graph, network)
+                mapping = next(matcher.isomorphisms_iter(), None)
+                if mapping is None:
+                    continue
+
+            self.hits += 1
+            self.entries.move_to_end(entryId)
+            relabeled = []
+            for profile in profiles:
+                image = [None] * len(profile)
+                for player, action in enumerate(profile):
+                    image[mapping[player]] = action
+                relabeled.append(tuple(image))
+            return sorted(relabeled)
+
+        self.misses += countMiss
+        return None
+
+    def store(self, key, network, symmetric, profiles):
+        import networkx as nx
+
+        bucketKey = self.bucketKey(key, network, symmetric)
+        self.buckets.setdefault(bucketKey, {})[self.nextId] = (
+            nx.Graph(network),
+            list(profiles),
+        )
+        self.entries[self.nextId] = bucketKey
+        self.nextId += 1
+
+        if len(self.entries) > self.maxSize:
+            entryId, bucketKey = self.entries.popitem(last=False)
+            del self.buckets[bucketKey][entryId]
+            if not self.buckets[bucketKey]:
+                del self.buckets[bucketKey]
+
+    def hitRate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self):
+        return "PCE cache: {} hits, {} misses ({:.0%} hit rate)".format(
+            self.hits, self.misses, self.hitRate()
+        )
+
+
+# Cache shared by every game in the process, so that separate game objects for the same payoffs also share results.
+defaultCache = PCECache()
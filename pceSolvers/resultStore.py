@@ -0,0 +1,106 @@
+"""
+Persistent, content-addressed store of solved PCE sets.
+
+Every result is filed under a hash of the game's payoffs, the network and the solver options that can change the
+answer, so sweeps that are interrupted (or split across workers) can be restarted and only solve the graphs that are
+not in the store yet. Results live in a single SQLite file, which several sweep processes can share.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+
+def graphKey(network):
+    """
+    Canonical form of a labeled network: the number of nodes and the sorted edge list over nodes relabeled 0..n-1 in
+    sorted order.
+    """
+    nodes = sorted(network.nodes())
+    label = {node: i for i, node in enumerate(nodes)}
+    edges = sorted(tuple(sorted((label[u], label[v]))) for u, v in network.edges())
+    return len(nodes), edges
+
+
+def resultKey(gameKey, network, options):
+    """
+    Address of the PCE set of the game identified by gameKey (see resultCache.gameKey) on network, solved with options.
+    """
+    shape, digest = gameKey
+    numNodes, edges = graphKey(network)
+    text = json.dumps(
+        [list(shape), digest, numNodes, edges, sorted(options.items())], default=str
+    )
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class PCEStore:
+    """
+    SQLite-backed map from resultKey to PCE sets, stored as int64 arrays of shape (numProfiles, numPlayers) next to
+    the network's edge list.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Sharded sweeps write to the same file, so wait on locks instead of failing.
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, numPlayers INTEGER, numActions INTEGER, edges TEXT, profiles BLOB)"
+        )
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, countMiss=True):
+        """
+        Returns the stored PCE set (a list of profile tuples) under key, or None if it has not been solved yet.
+        countMiss=False leaves a miss out of the report, as in PCECache.lookup.
+        """
+        row = self.connection.execute(
+            "SELECT numPlayers, profiles FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += countMiss
+            return None
+
+        self.hits += 1
+        numPlayers, blob = row
+        profiles = np.frombuffer(blob, dtype=np.int64).reshape(-1, numPlayers)
+        return list(map(tuple, profiles.tolist()))
+
+    def put(self, key, numPlayers, numActions, network, profiles):
+        _, edges = graphKey(network)
+        profiles = np.asarray(profiles, dtype=np.int64).reshape(-1, numPlayers)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (key, numPlayers, numActions, json.dumps(edges), profiles.tobytes()),
+            )
+
+    def __contains__(self, key):
+        return (
+            self.connection.execute(
+                "SELECT 1 FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            is not None
+        )
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def report(self):
+        return "PCE store {}: {} stored, {} loaded, {} solved".format(
+            self.path, len(self), self.hits, self.misses
+        )
@@ -0,0 +1,151 @@
+"""
+Symmetries of a game played on a network.
+
+A symmetry is a pair (playerPerm, actionPerm) acting on profiles by (g.s)[playerPerm[i]] = actionPerm[s[i]]. It is a
+symmetry of the PCE problem when playerPerm is an automorphism of the network and payoffs are invariant, i.e.
+u_{playerPerm[i]}(g.s) = u_i(s). B_G commutes with every such symmetry, so the PCE set is a union of orbits and a
+profile survives exactly when every profile in its orbit does.
+"""
+
+import itertools
+
+import numpy as np
+
+
+def applySymmetry(profiles, playerPerm, actionPerm):
+    """
+    Apply the symmetry (playerPerm, actionPerm) to an array of profiles of shape (numProfiles, numPlayers).
+    """
+    image = np.empty_like(profiles)
+    image[:, playerPerm] = np.asarray(actionPerm)[profiles]
+    return image
+
+
+def isSymmetry(payoffs, playerPerm, actionPerm, network=None):
+    """
+    Check that (playerPerm, actionPerm) leaves the payoff tensor (and the network, if given) invariant.
+    """
+    numPlayers, numActions = payoffs.shape[0], payoffs.shape[1]
+    if network is not None and any(
+        not network.has_edge(playerPerm[u], playerPerm[v]) for u, v in network.edges()
+    ):
+        return False
+
+    profiles = np.array(
+        list(itertools.product(range(numActions), repeat=numPlayers)), dtype=np.intp
+    )
+    image = applySymmetry(profiles, playerPerm, actionPerm)
+    flat = payoffs.reshape(numPlayers, -1)
+    radix = numActions ** np.arange(numPlayers - 1, -1, -1)
+    return np.allclose(flat[playerPerm][:, image @ radix], flat)
+
+
+def automorphismGenerators(network):
+    """
+    Returns a generating set of the automorphism group of network.
+
+    Builds the stabilizer chain of the group: for each vertex k and each w, one automorphism (found with VF2) that
+    fixes vertices 0..k-1 and maps k to w. These coset representatives generate the whole group.
+    """
+    import networkx as nx
+
+    nodes = sorted(network.nodes())
+    generators = []
+    for k, vertex in enumerate(nodes):
+        for target in nodes[k + 1 :]:
+            first, second = nx.Graph(network), nx.Graph(network)
+            for fixed in nodes[:k]:
+                first.nodes[fixed]["color"] = second.nodes[fixed]["color"] = fixed
+            first.nodes[vertex]["color"] = second.nodes[target]["color"] = "moved"
+
+            matcher = nx.algorithms.isomorphism.GraphMatcher(
+                first,
+                second,
+                node_match=lambda a, b: a.get("color") == b.get("color"),
+            )
+            mapping = next(matcher.isomorphisms_iter(), None)
+            if mapping is not None:
+                generators.append([mapping[node] for node in nodes])
+    return generators
+
+
+def detectSymmetries(payoffs, network):
+    """
+    Returns generators (playerPerm, actionPerm) of a group of symmetries of the game on network: the network
+    automorphisms that leave payoffs invariant, and the transpositions of actions that leave payoffs invariant.
+    """
+    numPlayers, numActions = payoffs.shape[0], payoffs.shape[1]
+    identityPlayers = list(range(numPlayers))
+    identityActions = list(range(numActions))
+
+    generators = []
+    for playerPerm in automorphismGenerators(network):
+        if isSymmetry(payoffs, playerPerm, identityActions):
+            generators.append((playerPerm, identityActions))
+
+    for a, b in itertools.combinations(range(numActions), 2):
+        actionPerm = list(identityActions)
+        actionPerm[a], actionPerm[b] = b, a
+        if isSymmetry(payoffs, identityPlayers, actionPerm):
+            generators.append((identityPlayers, actionPerm))
+    return generators
+
+
+def closedSubset(profiles, generators, numActions):
+    """
+    Largest subset of profiles that is closed under the group generated by generators, as a boolean mask over
+    profiles. If profiles contains a set that is closed under the group (such as the PCE), so does the subset.
+    """
+    profiles = np.asarray(profiles, dtype=np.intp)
+    numPlayers = profiles.shape[1]
+    radix = numActions ** np.arange(numPlayers - 1, -1, -1)
+    codes = profiles @ radix
+    keep = np.ones(len(codes), dtype=bool)
+    changed = True
+    while changed:
+        changed = False
+        for playerPerm, actionPerm in generators:
+            image = applySymmetry(profiles, playerPerm, actionPerm) @ radix
+            closed = keep & np.isin(image, codes[keep])
+            if not np.array_equal(closed, keep):
+                keep, changed = closed, True
+    return keep
+
+
+def profileOrbits(profiles, generators, numActions):
+    """
+    Partition profiles into orbits of the group generated by generators.
+
+    Returns a list holding, for each profile, the position in profiles of its orbit representative (the first member
+    in the order of profiles). profiles must be closed under the generators.
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    profiles = np.asarray(profiles, dtype=np.intp)
+    numProfiles, numPlayers = profiles.shape
+    radix = numActions ** np.arange(numPlayers - 1, -1, -1)
+    position = dict(zip((profiles @ radix).tolist(), range(numProfiles)))
+
+    rows, cols = [], []
+    for playerPerm, actionPerm in generators:
+        image = applySymmetry(profiles, playerPerm, actionPerm) @ radix
+        targets = [position.get(code, -1) for code in image.tolist()]
+        assert min(targets, default=0) >= 0, "Profiles are not closed under the symmetry group!"
+        rows.append(np.arange(numProfiles))
+        cols.append(np.array(targets, dtype=np.intp))
+
+    if not rows:
+        return list(range(numProfiles))
+
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    graph = coo_matrix(
+        (np.ones(len(rows)), (rows, cols)), shape=(numProfiles, numProfiles)
+    )
+    _, labels = connected_components(graph, directed=True, connection="weak")
+
+    # The first profile of each orbit is its representative.
+    first = {}
+    for i, label in enumerate(labels.tolist()):
+        first.setdefault(label, i)
+    return [first[label] for label in labels.tolist()]
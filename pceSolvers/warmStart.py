@@ -0,0 +1,89 @@
+"""
+Warm starts for sweeps over nested networks.
+
+Adding edges to a network only shrinks the consistent sets of B_G, so the PCE on a supergraph is contained in the PCE
+on any of its subgraphs. A sweep that visits graphs in order of edge inclusion can therefore start each solve from the
+PCE of a graph it has already solved (see DiscreteSolver's initialProfiles) instead of every profile.
+
+For games that are symmetric in the players the subgraph only has to embed into the network up to relabeling, in which
+case its PCE is relabeled through the embedding.
+"""
+
+
+def edgeSet(network):
+    return {tuple(sorted(edge)) for edge in network.edges()}
+
+
+def nestedOrder(graphs):
+    """
+    Sort graphs by number of edges, so that every graph comes after all of its proper subgraphs.
+    """
+    return sorted(graphs, key=lambda graph: graph.number_of_edges())
+
+
+class SubgraphSeeds:
+    """
+    Solved (network, PCE) pairs that later solves can be seeded from.
+
+    seed(network) looks for a solved graph that is a subgraph of network (an identical labeled subgraph, or with
+    embed=True any subgraph up to isomorphism) and returns its PCE carried over to network. Among those, graphs with
+    the smallest PCE are tried first, and at most maxCandidates graphs are searched for an embedding per lookup.
+    """
+
+    def __init__(self, embed=False, maxCandidates=10):
+        self.embed = embed
+        self.maxCandidates = maxCandidates
+        self.solved = []
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, network, profiles):
+        self.solved.append((network, edgeSet(network), list(profiles)))
+        self.solved.sort(key=lambda entry: len(entry[2]))
+
+    def seed(self, network):
+        """
+        Returns a superset of the PCE on network taken from a solved subgraph, or None if no subgraph was solved.
+        """
+        edges = edgeSet(network)
+        candidates = [
+            (graph, graphEdges, profiles)
+            for graph, graphEdges, profiles in self.solved
+            if len(graph) == len(network) and len(graphEdges) <= len(edges)
+        ]
+
+        # Labeled subgraphs are found with a set comparison, so try them all before searching for embeddings.
+        for _, graphEdges, profiles in candidates:
+            if graphEdges <= edges:
+                self.hits += 1
+                return profiles
+
+        if self.embed:
+            degrees = sorted(d for _, d in network.degree())
+            for graph, _, profiles in candidates[: self.maxCandidates]:
+                # A subgraph cannot have a larger k-th smallest degree than the network.
+                if any(a > b for a, b in zip(sorted(d for _, d in graph.degree()), degrees)):
+                    continue
+                mapping = self.embedding(graph, network)
+                if mapping is not None:
+                    self.hits += 1
+                    return [
+                        tuple(profile[mapping[node]] for node in range(len(network)))
+                        for profile in profiles
+                    ]
+
+        self.misses += 1
+        return None
+
+    @staticmethod
+    def embedding(graph, network):
+        """
+        A map from the nodes of network onto the nodes of graph under which every edge of graph is an edge of network,
+        or None if there is none.
+        """
+        from networkx.algorithms.isomorphism import GraphMatcher
+
+        return next(GraphMatcher(network, graph).subgraph_monomorphisms_iter(), None)
+
+    def report(self):
+        return "Warm starts: {} seeded, {} from scratch".format(self.hits, self.misses)
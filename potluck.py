@@ -1,7 +1,4 @@
-import pygambit
-import itertools
 import numpy as np
-from matplotlib import pyplot as plt
 from params_proto import PrefixProto
 
 from game import SimpleGame
@@ -23,49 +20,33 @@ class PotluckArgs(PrefixProto):
 
 
 class PotluckGame(SimpleGame):
+    anonymous = True
+
     def __init__(self, numPlayers, verbose=False, u=lambda x: x):
         """
         Create a new potluck game with numPlayers players.
         u: the common utility function that is used by all players, assumed to be monotonic in number of unique dishes.
         """
         super().__init__(numPlayers, numPlayers, [u] * numPlayers)
-        self.game = PotluckGame.createGame(numPlayers, u)
         self.verbose = verbose
 
-    @staticmethod
-    def createGame(n, u):
+    def createPayoffs(self):
         """
-        Creates the potluck game using the gambit library.
-
-        Parameters:
-        n (int): The number of players in the game.
-        u (function): The common utility function, which takes the number of unique dishes as input and returns the utility.
-
-        Returns:
-        gambit.Game: The potluck game represented as a normal form game in gambit.
+        Build the payoff tensor of the potluck game for all profiles at once: every player gets u(number of unique
+        dishes).
         """
+        _, counts = self.actionCounts()
+        unique_dishes = np.count_nonzero(counts, axis=1)
 
-        # Create a list of strategies for each player
-        game = pygambit.Game.new_table([n] * n)
-
-        game.title = "Potluck Game"
-
-        # Iterate through all strategy profiles to set rewards (without using game.contingencies)
-        for profile in itertools.product(range(n), repeat=n):
-            # Compute the number of unique dishes
-            unique_dishes = len(set(profile))
-
-            # Calculate the utility using the provided function
-            utility = u(unique_dishes)
-
-            # Assign the utility to each player
-            for player in range(n):
-                game[profile][player] = utility
-
-        return game
+        # Tabulate the common utility function over 1..n unique dishes.
+        table = np.array([self.utilities[0](k) for k in range(1, self.numPlayers + 1)])
+        payoffs = np.tile(table[unique_dishes - 1], (self.numPlayers, 1))
+        return payoffs.reshape((self.numPlayers,) + (self.numActions,) * self.numPlayers)
 
 
 if __name__ == "__main__":
+    from matplotlib import pyplot as plt
+
     # game = PotluckGame(2)
 
     # # Compute pure nash equilibria
@@ -4,9 +4,14 @@ import pickle
 if __name__ == "__main__":
     results = {}
     n = 8
+    # Every p reads the same seeded graph stream (common random numbers). Each estimate stops once its 95% confidence
+    # interval is at most 0.2 wide, the precision of 100 trials at an estimate of 1/2, and never runs more than those
+    # 100 trials.
     for p in [0.25, 0.5, 0.75]:
-        res, goodGraphs, badGraphs = simulateRandomGraphs(100, n, p)
-        results[p] = res
+        estimate, interval, goodGraphs, badGraphs = simulateRandomGraphs(
+            100, n, p, targetWidth=0.2, seed=0
+        )
+        results[p] = (estimate, interval)
         with open("results/majority_random_graphs.pkl", "wb") as f:
             pickle.dump(results, f)
 
@@ -0,0 +1,71 @@
+"""
+Adaptive Monte Carlo estimation of probabilities over random graph streams.
+
+Trials are run until the Wilson score interval of the success probability is narrower than a target width, instead of
+for a fixed number of trials. Combined with the seeded streams of graphs.randomGraphs, trial i sees the same random
+numbers for every edge probability, so estimates across a sweep over p are positively correlated and their differences
+need far fewer trials than independent runs would.
+"""
+
+import math
+from statistics import NormalDist
+
+
+def wilsonInterval(successes, trials, confidence=0.95):
+    """
+    Wilson score interval (low, high) for a binomial success probability after successes out of trials.
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    denominator = trials + z**2
+    center = (successes + z**2 / 2) / denominator
+    halfWidth = (
+        z
+        / denominator
+        * math.sqrt(successes * (trials - successes) / trials + z**2 / 4)
+    )
+    return max(0.0, center - halfWidth), min(1.0, center + halfWidth)
+
+
+class AdaptiveEstimate:
+    """
+    Running estimate of a success probability with a stopping rule: done() once at least minTrials trials were
+    recorded and the Wilson interval is at most targetWidth wide, or after maxTrials trials. targetWidth=None always
+    runs maxTrials trials.
+    """
+
+    def __init__(self, targetWidth=0.05, confidence=0.95, minTrials=20, maxTrials=None):
+        assert (
+            targetWidth is not None or maxTrials is not None
+        ), "Need a target width or a maximum number of trials!"
+        self.targetWidth = targetWidth
+        self.confidence = confidence
+        self.minTrials = minTrials
+        self.maxTrials = maxTrials
+        self.successes = 0
+        self.trials = 0
+
+    def record(self, success):
+        self.successes += bool(success)
+        self.trials += 1
+
+    def interval(self):
+        return wilsonInterval(self.successes, self.trials, self.confidence)
+
+    def estimate(self):
+        return self.successes / self.trials if self.trials else float("nan")
+
+    def done(self):
+        if self.maxTrials is not None and self.trials >= self.maxTrials:
+            return True
+        if self.targetWidth is None or self.trials < self.minTrials:
+            return False
+        low, high = self.interval()
+        return high - low <= self.targetWidth
+
+    def report(self):
+        low, high = self.interval()
+        return "{:.4f} ({:.0%} CI [{:.4f}, {:.4f}]) from {} trials".format(
+            self.estimate(), self.confidence, low, high, self.trials
+        )
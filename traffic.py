@@ -1,16 +1,17 @@
 import pickle
-import networkx as nx
-import pygambit
-import itertools
 import numpy as np
-import subprocess
 
 from tqdm import tqdm
 
 from game import SimpleGame
+from graphs import regularGraphs
+from pceSolvers.resultStore import PCEStore
+from pceSolvers.warmStart import SubgraphSeeds
 
 
 class TrafficGame(SimpleGame):
+    anonymous = True
+
     def __init__(self, numPlayers, numRoads, verbose=False, u=lambda x: -x):
         """
         Create a new traffic game with numPlayers players and numRoads roads.
@@ -19,33 +20,24 @@ class TrafficGame(SimpleGame):
         """
         # super().__init__(numPlayers, numRoads, [u] * (numPlayers-1) + [lambda x: -u(x)])
         super().__init__(numPlayers, numRoads, [u] * numPlayers)
-        self.game = self.createGame()
         self.verbose = verbose
 
-    def createGame(self):
+    def createPayoffs(self):
         """
-        Create a new traffic game with numPlayers players and numRoads roads.
+        Build the payoff tensor for all profiles at once from the number of drivers taking each road.
         """
+        actions, counts = self.actionCounts()
 
-        game = pygambit.Game.new_table([self.numActions] * self.numPlayers)
-
-        game.title = "trafficGame"
-
-        # Iterate through all strategy profiles to set rewards (without using game.contingencies)
-        for profile in itertools.product(
-            range(self.numActions), repeat=self.numPlayers
-        ):
+        # The utility only depends on how many drivers share the player's road, so tabulate it over 1..numPlayers.
+        road_counts = np.take_along_axis(counts, actions, axis=1).T
+        payoffs = np.empty(road_counts.shape)
+        for player in range(self.numPlayers):
+            table = np.array(
+                [int(self.utilities[player](c)) for c in range(1, self.numPlayers + 1)]
+            )
+            payoffs[player] = table[road_counts[player] - 1]
 
-            # For each profile, compute the number of drivers taking each road
-            road_counts = np.bincount(profile, minlength=self.numActions)
-
-            # Assign utility to each player
-            for player in range(self.numPlayers):
-                game[profile][player] = int(
-                    self.utilities[player](road_counts[profile[player]])
-                )
-
-        return game
+        return payoffs.reshape((self.numPlayers,) + (self.numActions,) * self.numPlayers)
 
 
 def numUniqueRoads(profiles):
@@ -63,93 +55,85 @@ def numUniqueRoads(profiles):
     ]
 
 
-def analyzeGame(minN, maxN):
+def analyzeGame(minN, maxN, res=0, mod=1, storePath="results/traffic_pce.sqlite"):
     """
     Examine all gamma-regular graphs with up to maxN nodes and find the number of unique roads taken by all players.
+    Only every mod-th graph starting at res is examined, to split the enumeration across workers. Each shard writes its
+    own results file and only knows the minimum over its own graphs, so shards never stop early; merge their results
+    by taking the minimum per (n, k, gamma).
+
+    Every PCE set is saved in the PCEStore at storePath (None disables it), so an interrupted analysis picks up where it
+    stopped when run again: graphs that were already solved are read back from the store.
     """
+    store = PCEStore(storePath) if storePath is not None else None
+    if mod == 1:
+        resultsPath = "results/traffic_regular_analysis_pt2.pkl"
+    else:
+        resultsPath = "results/traffic_regular_analysis_pt2_{}of{}.pkl".format(res, mod)
     results = {}
     for n in range(minN, maxN + 1):
         for k in range(1, n + 1):
             game = TrafficGame(n, k, verbose=True)
+            game.resultStore = store
+
+            # gamma grows, so every graph has the graphs of smaller gammas as candidate subgraphs to warm start from.
+            seeds = SubgraphSeeds(embed=True)
 
             for gamma in range(1, n + 1):
                 # Play this game on all of these graphs; count the number of unique roads taken by all players and we
                 # want to get the minimum.
 
                 # Look through all gamma-regular graphs with n nodes
-                # n = 6
-                # gamma = 3
-
-                geng_cmd = f"geng -c -d{gamma} -D{gamma} {n}"
-                showg_cmd = "showg -e"
-
-                # Run the geng and showg commands and get the output
-                geng_output = subprocess.run(
-                    geng_cmd, stdout=subprocess.PIPE, shell=True, text=True
-                )
-                edge_list_output = subprocess.run(
-                    showg_cmd,
-                    input=geng_output.stdout,
-                    stdout=subprocess.PIPE,
-                    shell=True,
-                    text=True,
-                )
-
-                # Split the output into individual edge lists
-                edge_lists = edge_list_output.stdout.strip().split("\n\n")
-
-                all_graphs = []
-                for edge_list in edge_lists:
-                    G = nx.Graph()
-                    G.add_nodes_from(range(n))
-                    G.add_edges_from(parse_edge_list(edge_list))
-                    all_graphs.append(G)
-
-                mins = []
+                all_graphs = regularGraphs(n, gamma, res=res, mod=mod)
+
+                # Keep only the best graph so far instead of the whole enumeration.
+                best = None
                 for graph in tqdm(
                     all_graphs,
                     desc=f"Solving gamma-complete graphs for n={n}, k={k}, gamma={gamma}",
                 ):
                     game.configureSolver(
-                        graph, "PULP_CBC_CMD", writePath=None
+                        graph,
+                        "PULP_CBC_CMD",
+                        writePath=None,
+                        initialProfiles=seeds.seed(graph),
                     )  # "results/traffic.pkl")
-                    unique, _ = numUniqueRoads(game.solvePCE())
-                    mins.append(unique)
+                    pce = game.solvePCE()
+                    seeds.add(graph, pce)
+                    unique, _ = numUniqueRoads(pce)
+                    if best is None or unique < best[0]:
+                        best = unique, graph
+
+                if best is None:
+                    print(f"No {gamma}-regular graphs with {n} nodes found!")
+                    continue
 
-                idx = np.argmin(np.array(mins))
-                results[(n, k, gamma)] = mins[idx], all_graphs[idx]
+                if game.pceCache is not None:
+                    print(game.pceCache.report())
+                if store is not None:
+                    print(store.report())
+                print(seeds.report())
+
+                results[(n, k, gamma)] = best
 
                 # if the value is equal to k, then we are done with this value of gamma
                 # since f is monotonically increasing in gamma
 
                 # Save the results
-                print("Saving results to results/traffic_regular_analysis_2.pkl")
-                with open("results/traffic_regular_analysis_pt2.pkl", "wb") as f:
+                print(f"Saving results to {resultsPath}")
+                with open(resultsPath, "wb") as f:
                     pickle.dump(results, f)
 
-                if mins[idx] == k:
+                # A shard's best is only the minimum over its own graphs, not f(gamma), so only a full enumeration can
+                # stop early.
+                if mod == 1 and best[0] == k:
                     print(
                         f"Stopping early since we have found gamma={gamma} such that f(gamma)=k={k}"
                     )
                     break
             print(f"Finished analyzing n={n}, k={k}")
         print(f"Finished analyzing n={n}")
-    print("Done analyzing all games! Saved to results/traffic_regular_analysis.pkl! 🍾")
-
-
-def parse_edge_list(edge_list):
-    lines = edge_list.split("\n")
-    if len(lines) < 3:
-        return []
-
-    edges_line = "  ".join(lines[2:])
-    edge_pairs = edges_line.split("  ")  # Split with two spaces
-    edges = []
-    for edge_pair in edge_pairs:
-        u, v = map(int, edge_pair.split())
-        edges.append((u, v))
-
-    return edges
+    print(f"Done analyzing all games! Saved to {resultsPath}! 🍾")
 
 
 if __name__ == "__main__":